@@ -1,10 +1,26 @@
+from qcparsers.tools.elements import numbers_to_symbols
 import numpy as np
-import pickle
+import hashlib
+import io
+import weakref
+
+
+# shell type code: [label, number of functions]
+typeList = {'0': ['s', 1],
+            '1': ['p', 3],
+            '2': ['d', 6],
+            '3': ['f', 10],
+            '-1': ['sp', 4],
+            '-2': ['d_', 5],
+            '-3': ['f_', 7]}
 
 
 class BasisSet():
     """
     This object contains the Basis Set data of the molecule
+
+    The shells are stored in flat arrays (one element per shell or per primitive)
+    with the offsets of the shells of each atom and of the primitives of each shell.
     """
 
     def __init__(self,
@@ -21,7 +37,7 @@ class BasisSet():
         """
         :param basis_set_name: the name of basis set
         :param atomic_numbers: atomic numbers
-        :param atomic_symbols: the symbols
+        :param atomic_symbols: the symbols (obtained from the atomic numbers if None)
         :param shell_type: types of shell (check typeList)
         :param n_primitives: number of primitives
         :param atom_map: map shell - atom
@@ -31,47 +47,157 @@ class BasisSet():
         :return:
         """
 
-        typeList = {'0': ['s', 1],
-                    '1': ['p', 3],
-                    '2': ['d', 6],
-                    '3': ['f', 10],
-                    '-1': ['sp', 4],
-                    '-2': ['d_', 5],
-                    '-3': ['f_', 7]}
+        self._name = basis_set_name
+        self._atomic_numbers = [int(an) for an in atomic_numbers]
+        if atomic_symbols is None:
+            atomic_symbols = numbers_to_symbols(self._atomic_numbers)
+        self._atomic_symbols = [str(symbol) for symbol in atomic_symbols[:len(self._atomic_numbers)]]
 
-        atomic_numbers = [int(an) for an in atomic_numbers]
-        atom_map = np.array(atom_map, dtype=int)
-        # print(atom_map)
-        self._basis_set = {'name': basis_set_name,
-                          'primitive_type': 'gaussian'}
+        self._shell_type = np.array(shell_type, dtype=int).reshape(-1)
+        self._n_primitives = np.array(n_primitives, dtype=int).reshape(-1)
+        self._p_exponents = np.array(p_exponents, dtype=float).reshape(-1)
+        self._c_coefficients = np.array(c_coefficients, dtype=float).reshape(-1)
+        self._p_c_coefficients = np.array(p_c_coefficients, dtype=float).reshape(-1)
 
-        shell_type_index = [0] + np.cumsum([typeList['{}'.format(s)][1]
-                                            for s in shell_type]).tolist()
-        prim_from_shell_index = [0] + np.cumsum(np.array(n_primitives, dtype=int)).tolist()
+        # shells of each atom (in order of atom_map)
+        atom_map = np.array(atom_map, dtype=int).reshape(-1)
+        self._atom_shell_index, self._atom_shell_counts = np.unique(atom_map, return_index=True, return_counts=True)[1:]
 
-        # print(shell_type_index)
-        # print(prim_from_shell_index)
+        self._build_offsets()
 
-        atoms_data = []
-        for iatom, atomic_number in enumerate(atomic_numbers):
-            symbol = str(atomic_symbols[iatom])
+    def _build_offsets(self):
+        self._primitive_offsets = np.concatenate([[0], np.cumsum(self._n_primitives)])
+        self._function_offsets = np.concatenate([[0], np.cumsum([typeList['{}'.format(s)][1]
+                                                                 for s in self._shell_type])]).astype(int)
+        self._fingerprint = self._get_fingerprint()
+
+    def _get_fingerprint(self):
+        # only the shells (and primitives) that belong to the atoms
+        shells = np.zeros(len(self._shell_type), dtype=bool)
+        for ini, n in zip(self._atom_shell_index, self._atom_shell_counts):
+            shells[ini: ini + n] = True
+        primitives = np.repeat(shells, self._n_primitives)
+
+        fingerprint = hashlib.blake2b(digest_size=20)
+        fingerprint.update(repr((self._name, self._atomic_numbers, self._atomic_symbols)).encode())
+        for array in [self._atom_shell_counts, self._shell_type[shells], self._n_primitives[shells]]:
+            fingerprint.update(np.ascontiguousarray(array, dtype=np.int64).tobytes())
+        for array in [self._p_exponents, self._c_coefficients, self._p_c_coefficients]:
+            fingerprint.update(np.ascontiguousarray(array[primitives], dtype=np.float64).tobytes())
+
+        return fingerprint.hexdigest()
+
+    def __getstate__(self):
+        return {key: value for key, value in self.__dict__.items() if key not in ['_fingerprint']}
+
+    def __setstate__(self, state):
+        if '_atomic_numbers' in state:
+            self.__dict__.update(state)
+            self._build_offsets()
+        else:
+            # objects stored before the use of flat arrays only contain the dictionary
+            self._set_from_dictionary(state['_basis_set'])
+
+    def _set_from_dictionary(self, basis_set):
+        labels = {label: int(code) for code, (label, n_functions) in typeList.items()}
+        shells = [shell for atom in basis_set['atoms'] for shell in atom['shells']]
+
+        self._name = basis_set['name']
+        self._atomic_numbers = [atom['atomic_number'] for atom in basis_set['atoms']]
+        self._atomic_symbols = [atom['symbol'] for atom in basis_set['atoms']]
+
+        self._shell_type = np.array([labels[shell['shell_type']] for shell in shells], dtype=int)
+        self._n_primitives = np.array([len(shell['p_exponents']) for shell in shells], dtype=int)
+        self._p_exponents = np.array([p for shell in shells for p in shell['p_exponents']], dtype=float)
+        self._c_coefficients = np.array([c for shell in shells for c in shell['con_coefficients']], dtype=float)
+        self._p_c_coefficients = np.array([c for shell in shells for c in shell['p_con_coefficients']], dtype=float)
+
+        self._atom_shell_counts = np.array([len(atom['shells']) for atom in basis_set['atoms']], dtype=int)
+        self._atom_shell_index = np.concatenate([[0], np.cumsum(self._atom_shell_counts)[:-1]]).astype(int)
+
+        self._build_offsets()
+
+    def __hash__(self):
+        return hash(self._fingerprint)
+
+    def __eq__(self, other):
+        if isinstance(other, BasisSet):
+            return other._fingerprint == self._fingerprint
+        return NotImplemented
+
+    @property
+    def fingerprint(self):
+        """
+        returns the fingerprint of the basis set (equal for identical basis sets)
+
+        :return: the fingerprint
+        """
+        return self._fingerprint
+
+    @property
+    def name(self):
+        """
+        returns the name of the basis set
+
+        :return: the name
+        """
+        return self._name
+
+    def get_number_of_shells(self):
+        """
+        get the number of shells
+
+        :return: number of shells
+        """
+        return len(self._shell_type)
+
+    def get_number_of_functions(self):
+        """
+        get the number of basis functions
+
+        :return: number of basis functions
+        """
+        return int(self._function_offsets[-1])
 
-            shell_from_atom_counts = np.unique(atom_map, return_counts=True)[1]
-            shell_from_atom_index = np.unique(atom_map, return_index=True)[1]
-            # print(shell_from_atom_counts)
-            # print('atom_indexes', shell_from_atom_index)
-            # print('atom_number', iatom)
-            # print('shells index', shell_from_atom_index[iatom])
-            # print('number of shells', shell_from_atom_counts[iatom])
+    def get_atom_shells(self, atom):
+        """
+        get the indices of the shells of an atom
 
+        :param atom: the atom index
+        :return: range of shell indices
+        """
+        ini = self._atom_shell_index[atom]
+        return range(ini, ini + self._atom_shell_counts[atom])
+
+    def get_shell_primitives(self, shell):
+        """
+        get the slice of the primitives of a shell in the exponents/coefficients arrays
+
+        :param shell: the shell index
+        :return: slice of the primitives
+        """
+        return slice(self._primitive_offsets[shell], self._primitive_offsets[shell + 1])
+
+    def get_dictionary(self):
+        """
+        get the basis set as a dictionary (a new dictionary is generated in each call
+        since the same basis set can be shared by different parsed outputs)
+
+        :return: the basis set dictionary
+        """
+        p_exponents = self._p_exponents.tolist()
+        c_coefficients = self._c_coefficients.tolist()
+        p_c_coefficients = self._p_c_coefficients.tolist()
+        primitive_offsets = self._primitive_offsets.tolist()
+        shell_type = self._shell_type.tolist()
+
+        atoms_data = []
+        for iatom, atomic_number in enumerate(self._atomic_numbers):
             shells_data = []
-            for ishell in range(shell_from_atom_counts[iatom]):
-                st = typeList['{}'.format(shell_type[shell_from_atom_index[iatom] + ishell])]
-                # print(st, ishell)
-                ini_prim = prim_from_shell_index[shell_from_atom_index[iatom] + ishell]
-                fin_prim = prim_from_shell_index[shell_from_atom_index[iatom] + ishell + 1]
-                # print(ini_prim)
-                # print(fin_prim)
+            for ishell in self.get_atom_shells(iatom):
+                st = typeList['{}'.format(shell_type[ishell])]
+                ini_prim = primitive_offsets[ishell]
+                fin_prim = primitive_offsets[ishell + 1]
 
                 shells_data.append({
                     'shell_type': st[0],
@@ -82,38 +208,87 @@ class BasisSet():
                 })
 
             atoms_data.append({'shells': shells_data,
-                               'symbol': symbol,
+                               'symbol': self._atomic_symbols[iatom],
                                'atomic_number': atomic_number})
 
-        self._basis_set['atoms'] = atoms_data
+        return {'name': self._name,
+                'primitive_type': 'gaussian',
+                'atoms': atoms_data}
 
-    def __hash__(self):
-        return hash(pickle.dumps(self._basis_set, protocol=2))
+    def get_element_atoms(self):
+        """
+        get one atom of each element, or all the atoms of the elements whose atoms have different basis
 
-    def __eq__(self, other):
-        return hash(other) == hash(self)
+        :return: list of atom indices in order of appearance
+        """
+        element_atoms = {}
+        for iatom, symbol in enumerate(self._atomic_symbols):
+            shells = self.get_atom_shells(iatom)
+            primitives = slice(self._primitive_offsets[shells.start], self._primitive_offsets[shells.stop])
+            signature = (self._shell_type[shells.start: shells.stop].tobytes(),
+                         self._n_primitives[shells.start: shells.stop].tobytes(),
+                         self._p_exponents[primitives].tobytes(),
+                         self._c_coefficients[primitives].tobytes(),
+                         self._p_c_coefficients[primitives].tobytes())
 
-    def get_dictionary(self):
-        return self._basis_set
+            element_atoms.setdefault(symbol, []).append((iatom, signature))
+
+        atoms = []
+        for symbol_atoms in element_atoms.values():
+            if len(set([signature for iatom, signature in symbol_atoms])) == 1:
+                atoms.append(symbol_atoms[0][0])
+            else:
+                atoms += [iatom for iatom, signature in symbol_atoms]
+
+        return sorted(atoms)
+
+    def write_qc_input(self, stream, by_element=False):
+        """
+        Write the basis in plane text in the format of Q-chem/Gaussian input
+
+        :param stream: text file object
+        :param by_element: write the basis of each element once instead of the basis of each atom
+                           (the basis of each atom is written for elements whose atoms have different basis)
+        """
+        atoms = self.get_element_atoms() if by_element else range(len(self._atomic_numbers))
 
-    def get_qc_input_txt(self):
+        for iatom in atoms:
+            stream.write(self._atomic_symbols[iatom] + '\n')
+            for ishell in self.get_atom_shells(iatom):
+                shell_type = typeList['{}'.format(self._shell_type[ishell])][0].upper()
+                primitives = self.get_shell_primitives(ishell)
+
+                columns = [self._p_exponents[primitives], self._c_coefficients[primitives]]
+                if shell_type in ['SP']:
+                    columns.append(self._p_c_coefficients[primitives])
+
+                stream.write('{} {} {}\n'.format(shell_type, self._n_primitives[ishell], 1.00))
+                np.savetxt(stream, np.column_stack(columns), fmt='%15.10e', newline=' \n')
+
+            stream.write('****\n')
+
+    def get_qc_input_txt(self, by_element=False):
         """
         Return basis in plane text in the format of Q-chem/Gaussian input
 
+        :param by_element: write the basis of each element once instead of the basis of each atom
+                           (the basis of each atom is written for elements whose atoms have different basis)
         :return: the basis set
         """
+        stream = io.StringIO()
+        self.write_qc_input(stream, by_element=by_element)
+        return stream.getvalue()
 
-        basis_txt = ''
 
-        for atom in self._basis_set['atoms']:
-            basis_txt += atom['symbol'] + '\n'
-            for shell in atom['shells']:
-                basis_txt += '{} {} {}\n'.format(shell['shell_type'].upper(), len(shell['p_exponents']), 1.00)
-                for p, c, pc in zip(shell['p_exponents'], shell['con_coefficients'], shell['p_con_coefficients']):
-                    if shell['shell_type'].upper() in ['SP']:
-                        basis_txt += '{:15.10e} {:15.10e} {:15.10e} \n'.format(p, c, pc)
-                    else:
-                        basis_txt += '{:15.10e} {:15.10e} \n'.format(p, c)
+# registry of the basis sets in memory indexed by their fingerprint
+basis_registry = weakref.WeakValueDictionary()
 
-            basis_txt += '****\n'
-        return basis_txt
+
+def intern_basis(basis):
+    """
+    get the instance of an identical basis set already in memory (or register this one)
+
+    :param basis: the basis set
+    :return: the shared basis set instance
+    """
+    return basis_registry.setdefault(basis.fingerprint, basis)
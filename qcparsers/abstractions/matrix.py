@@ -0,0 +1,129 @@
+import numpy as np
+
+
+class PackedSymmetricMatrix:
+    """
+    This object contains a symmetric matrix stored as its packed lower triangle
+    (row by row, as written in FCHK files)
+    """
+    def __init__(self, packed):
+        """
+        :param packed: list containing the n(n+1)/2 elements of the lower triangle
+        """
+        self._packed = np.ascontiguousarray(packed, dtype=float).reshape(-1)
+
+        n = int(np.sqrt(0.25 + 2 * len(self._packed)) - 0.5)
+        if n * (n + 1) // 2 != len(self._packed):
+            raise ValueError('{} elements do not form a triangular matrix'.format(len(self._packed)))
+
+        self._n = n
+        self._dense = None
+
+    def __len__(self):
+        return self._n
+
+    def __repr__(self):
+        return 'PackedSymmetricMatrix(n={})'.format(self._n)
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None:
+            return self.get_dense()
+        return self.get_dense().astype(dtype)
+
+    def __getitem__(self, item):
+        if isinstance(item, tuple) and len(item) == 2 and all(isinstance(i, (int, np.integer)) for i in item):
+            i, j = [k + self._n if k < 0 else k for k in item]
+            if not (0 <= i < self._n and 0 <= j < self._n):
+                raise IndexError('index {} out of range for matrix of size {}'.format(item, self._n))
+            if j > i:
+                i, j = j, i
+            return self._packed[i * (i + 1) // 2 + j]
+
+        return self.get_dense()[item]
+
+    def __matmul__(self, other):
+        return self.dot(other)
+
+    @property
+    def shape(self):
+        """
+        returns the shape of the full matrix
+
+        :return: the shape
+        """
+        return self._n, self._n
+
+    def get_packed(self):
+        """
+        get the packed lower triangle
+
+        :return: numpy array with n(n+1)/2 elements
+        """
+        return self._packed
+
+    def get_diagonal(self):
+        """
+        get the diagonal elements
+
+        :return: numpy array
+        """
+        i = np.arange(self._n)
+        return self._packed[i * (i + 3) // 2]
+
+    def get_dense(self):
+        """
+        get the full matrix (built on first call and then cached)
+
+        :return: numpy array of shape (n, n)
+        """
+        if self._dense is None:
+            rows, columns = np.tril_indices(self._n)
+            dense = np.empty((self._n, self._n))
+            dense[rows, columns] = self._packed
+            dense[columns, rows] = self._packed
+            self._dense = dense
+        return self._dense
+
+    def dot(self, other):
+        """
+        matrix product with a vector or a matrix
+
+        :param other: vector (n) or matrix (n, m)
+        :return: numpy array
+        """
+        other = np.asarray(other)
+        if self._dense is not None or other.ndim != 1:
+            return self.get_dense() @ other
+
+        # matrix-vector product using the packed rows only
+        result = np.zeros(self._n, dtype=np.result_type(self._packed, other))
+        k = 0
+        for i in range(self._n):
+            row = self._packed[k:k + i + 1]
+            result[i] += row @ other[:i + 1]
+            result[:i] += row[:i] * other[i]
+            k += i + 1
+
+        return result
+
+    def trace_dot(self, other):
+        """
+        trace of the product with another matrix: Tr(A B)
+
+        :param other: matrix (n, n) or PackedSymmetricMatrix
+        :return: the trace
+        """
+        if isinstance(other, PackedSymmetricMatrix):
+            if len(other) != self._n:
+                raise ValueError('matrix sizes do not match: {} {}'.format(self._n, len(other)))
+            return 2 * np.dot(self._packed, other.get_packed()) - np.dot(self.get_diagonal(), other.get_diagonal())
+
+        return np.einsum('ij,ji->', self.get_dense(), np.asarray(other))
+
+    def tolist(self):
+        """
+        get the full matrix as nested lists
+
+        :return: list
+        """
+        return self.get_dense().tolist()
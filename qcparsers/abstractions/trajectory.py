@@ -0,0 +1,174 @@
+from qcparsers.abstractions.molecule import Molecule
+import numpy as np
+
+
+class Trajectory:
+    """
+    This object contains a sequence of structures of the same molecule (optimization, IRC)
+    stored in arrays
+    """
+    def __init__(self,
+                 coordinates,
+                 symbols,
+                 charge=0,
+                 multiplicity=1,
+                 energies=None,
+                 gradients=None,
+                 displacements=None,
+                 s2=None):
+        """
+        :param coordinates: array containing the cartesian coordinates of each step [n_steps, n_atoms, 3] in Angstrom
+        :param symbols: Symbols of the atoms within the molecule
+        :param charge: charge of the molecule
+        :param multiplicity: multiplicity of the molecule
+        :param energies: energy of each step
+        :param gradients: gradient of each step
+        :param displacements: displacement of each step
+        :param s2: S^2 of each step
+        """
+        self._coordinates = np.asarray(coordinates, dtype=float).reshape(-1, len(symbols), 3)
+        self._symbols = symbols
+        self._charge = charge
+        self._multiplicity = multiplicity
+
+        def step_array(values):
+            if values is None:
+                return None
+            return np.asarray(values, dtype=float).reshape(len(self._coordinates))
+
+        self._energies = step_array(energies)
+        self._gradients = step_array(gradients)
+        self._displacements = step_array(displacements)
+        self._s2 = step_array(s2)
+
+    def __len__(self):
+        return len(self._coordinates)
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, np.integer)):
+            return Molecule(coordinates=self._coordinates[item],
+                            symbols=self._symbols,
+                            charge=self._charge,
+                            multiplicity=self._multiplicity)
+
+        def select(values):
+            return None if values is None else values[item]
+
+        return Trajectory(self._coordinates[item],
+                          symbols=self._symbols,
+                          charge=self._charge,
+                          multiplicity=self._multiplicity,
+                          energies=select(self._energies),
+                          gradients=select(self._gradients),
+                          displacements=select(self._displacements),
+                          s2=select(self._s2))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self):
+        return 'Trajectory(n_steps={}, n_atoms={})'.format(*self._coordinates.shape[:2])
+
+    @property
+    def coordinates(self):
+        """
+        returns the coordinates of all the steps
+
+        :return: array [n_steps, n_atoms, 3]
+        """
+        return self._coordinates
+
+    @property
+    def symbols(self):
+        """
+        returns the symbols of the atoms
+
+        :return: list of symbols
+        """
+        return self._symbols
+
+    @property
+    def charge(self):
+        """
+        returns the charge
+
+        :return: the charge
+        """
+        return self._charge
+
+    @property
+    def multiplicity(self):
+        """
+        returns the multiplicity
+
+        :return: the multiplicity
+        """
+        return self._multiplicity
+
+    @property
+    def energies(self):
+        """
+        returns the energy of each step
+
+        :return: array [n_steps] (None if not available)
+        """
+        return self._energies
+
+    @property
+    def gradients(self):
+        """
+        returns the gradient of each step
+
+        :return: array [n_steps] (None if not available)
+        """
+        return self._gradients
+
+    @property
+    def displacements(self):
+        """
+        returns the displacement of each step
+
+        :return: array [n_steps] (None if not available)
+        """
+        return self._displacements
+
+    @property
+    def s2(self):
+        """
+        returns the S^2 of each step
+
+        :return: array [n_steps] (None if not available)
+        """
+        return self._s2
+
+    def get_number_of_atoms(self):
+        """
+        get the number of atoms
+
+        :return: number of atoms
+        """
+        return self._coordinates.shape[1]
+
+    def get_rmsd(self, reference=0):
+        """
+        get the root-mean-square deviation of the coordinates of each step with respect to a reference
+        (without alignment)
+
+        :param reference: index of the reference step or array of coordinates [n_atoms, 3]
+        :return: array [n_steps]
+        """
+        if isinstance(reference, (int, np.integer)):
+            reference = self._coordinates[reference]
+
+        difference = self._coordinates - np.asarray(reference, dtype=float)
+        return np.sqrt(np.einsum('sij,sij->s', difference, difference) / self.get_number_of_atoms())
+
+    def get_step_lengths(self):
+        """
+        get the norm of the change of the coordinates between consecutive steps
+
+        :return: array [n_steps-1]
+        """
+        difference = np.diff(self._coordinates, axis=0)
+        return np.sqrt(np.einsum('sij,sij->s', difference, difference))
@@ -0,0 +1,123 @@
+#
+# Parse many Q-Chem outputs in parallel using a pool of processes
+#
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from qcparsers.parsers import parser_basic, parser_cis, parser_fchk, parser_frequencies
+from qcparsers.parsers import parser_irc, parser_optimization, parser_rasci, parse_file
+from qcparsers.tools.errors import ParserError
+import collections
+import itertools
+import glob
+import os
+
+
+# content markers used to choose a parser (checked in order)
+detection_markers = [('Current cartesian coordinates', parser_fchk),
+                     ('RAS-CI total energy for state', parser_rasci),
+                     ('CIS Excitation Energies', parser_cis),
+                     ('TDDFT/TDA Excitation Energies', parser_cis),
+                     ('Reaction path following', parser_irc),
+                     ('Optimization Cycle', parser_optimization),
+                     ('VIBRATIONAL ANALYSIS', parser_frequencies)]
+
+
+def detect_parser(file_name, output=None):
+    """
+    Choose the parser for a file from its extension or its content
+
+    :param file_name: the file name
+    :param output: content of the file (read from the file if None)
+    :return: the parser function
+    """
+    if os.path.splitext(file_name)[1].lower() in ['.fchk', '.fch']:
+        return parser_fchk
+
+    if output is None:
+        with open(file_name, 'r') as f:
+            output = f.read()
+
+    for marker, parser in detection_markers:
+        if marker in output:
+            return parser
+
+    return parser_basic
+
+
+def parse_file_safe(file_name, parser=None, kwargs=None):
+    """
+    Parse a file returning the exception as a ParserError instead of raising it
+
+    :param file_name: the file name
+    :param parser: the parser function (detected from the file if None)
+    :param kwargs: dictionary of additional arguments of the parser
+    :return: parsed data or ParserError
+    """
+    parser_name = 'auto' if parser is None else parser.__name__
+    try:
+        if parser is None:
+            # the file is read once and the same content is used to choose the parser
+            with open(file_name, 'r') as f:
+                output = f.read()
+            parser = detect_parser(file_name, output=output)
+            parser_name = parser.__name__
+            return parser(output, **(kwargs or {}))
+        return parse_file(file_name, parser, **(kwargs or {}))
+    except Exception as e:
+        return ParserError(parser_name, '{}: {}: {}'.format(file_name, type(e).__name__, e))
+
+
+def parse_files_chunk(file_names, parser=None, kwargs=None):
+    """
+    Parse a list of files sequentially (task of a worker process)
+
+    :param file_names: list of file names
+    :param parser: the parser function (detected from each file if None)
+    :param kwargs: dictionary of additional arguments of the parser
+    :return: list of (file name, parsed data or ParserError)
+    """
+    return [(file_name, parse_file_safe(file_name, parser, kwargs)) for file_name in file_names]
+
+
+def parse_batch(files, parser=None, max_workers=None, chunk_size=1, ordered=True, **kwargs):
+    """
+    Parse many files in parallel using a pool of processes
+
+    Errors found parsing a file are returned as ParserError objects and do not
+    stop the batch.
+
+    :param files: list of file names or glob pattern
+    :param parser: the parser function (detected from each file if None)
+    :param max_workers: number of processes (number of CPUs if None)
+    :param chunk_size: number of files sent to a process in each task
+    :param ordered: return the results in the order of the files, otherwise as they are completed
+    :param kwargs: additional arguments of the parser
+    :return: generator of (file name, parsed data or ParserError)
+    """
+    if isinstance(files, str):
+        files = sorted(glob.glob(files))
+    files = list(files)
+
+    chunks = (files[i:i + chunk_size] for i in range(0, len(files), chunk_size))
+
+    # only a window of tasks is submitted at a time so the results are not kept in memory
+    max_workers = max_workers or os.cpu_count() or 1
+    window = 2 * max_workers
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = collections.deque(executor.submit(parse_files_chunk, chunk, parser, kwargs)
+                                    for chunk in itertools.islice(chunks, window))
+
+        while pending:
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                done = wait(pending, return_when=FIRST_COMPLETED)[0]
+                for future in done:
+                    pending.remove(future)
+
+            for chunk in itertools.islice(chunks, len(done)):
+                pending.append(executor.submit(parse_files_chunk, chunk, parser, kwargs))
+
+            for future in done:
+                for file_name, result in future.result():
+                    yield file_name, result
@@ -0,0 +1,251 @@
+#
+# Persistent on-disk cache of parsed data
+#
+# The results are stored as pickle files in a cache directory. Files are written
+# to a temporary file and moved in place (os.replace) so several processes can
+# share the same cache. The modification time of the files is used to evict the
+# least recently used results when the cache exceeds its maximum size.
+#
+from qcparsers.parsers import parse_file
+import qcparsers
+import qcparsers.parsers
+import functools
+import inspect
+import hashlib
+import json
+import tempfile
+import pickle
+import os
+
+
+default_cache_dir = os.environ.get('QCPARSERS_CACHE_DIR',
+                                   os.path.join(os.path.expanduser('~'), '.cache', 'qcparsers'))
+
+
+class ParserCache:
+    """
+    On-disk cache of the data returned by the parsers
+    """
+    def __init__(self, cache_dir=None, max_size=1024**3, fast=False):
+        """
+        :param cache_dir: directory where the results are stored
+        :param max_size: maximum size of the cache in bytes
+        :param fast: identify files by size and modification time instead of the hash of their content
+        """
+        self._cache_dir = default_cache_dir if cache_dir is None else cache_dir
+        self._max_size = max_size
+        self._fast = fast
+        # size of the cache (None: unknown, computed in the next eviction)
+        self._size = None
+
+        os.makedirs(self._cache_dir, exist_ok=True)
+
+    @property
+    def cache_dir(self):
+        return self._cache_dir
+
+    def get_key(self, parser, data, kwargs):
+        """
+        key of the parsed data
+
+        Arguments that cannot be serialized (ex: the OutputIndex of the output) are not
+        part of the key, they are assumed to not change the parsed data.
+
+        :param parser: the parser function
+        :param data: bytes identifying the parsed output
+        :param kwargs: additional arguments of the parser
+        :return: the key
+        """
+        key_kwargs = {}
+        for name, value in kwargs.items():
+            try:
+                json.dumps(value)
+            except (TypeError, ValueError):
+                continue
+            key_kwargs[name] = value
+
+        key = hashlib.blake2b(data, digest_size=20)
+        key.update('{} {} {}'.format(parser.__name__,
+                                     qcparsers.__version__,
+                                     json.dumps(key_kwargs, sort_keys=True)).encode())
+        return key.hexdigest()
+
+    def load(self, key):
+        """
+        load the data stored with a key
+
+        :param key: the key
+        :return: the data (None if not found)
+        """
+        file_name = os.path.join(self._cache_dir, key + '.pkl')
+        try:
+            with open(file_name, 'rb') as f:
+                data = pickle.load(f)
+            # mark as recently used
+            os.utime(file_name)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+        return data
+
+    def store(self, key, data):
+        """
+        store data with a key
+
+        :param key: the key
+        :param data: the data
+        """
+        try:
+            fd, temp_name = tempfile.mkstemp(dir=self._cache_dir, suffix='.tmp')
+        except OSError:
+            return
+
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+                size = f.tell()
+            os.replace(temp_name, os.path.join(self._cache_dir, key + '.pkl'))
+        except Exception:
+            # data that cannot be pickled (ex: lazy fchk) is not cached
+            if os.path.exists(temp_name):
+                os.remove(temp_name)
+            return
+
+        # the cache directory is only scanned when the size may exceed the maximum
+        # (data stored by other processes is counted in the next scan)
+        if self._size is not None:
+            self._size += size
+        if self._size is None or self._size > self._max_size:
+            self.evict()
+
+    def evict(self):
+        """
+        remove the least recently used data until the cache fits in its maximum size
+        """
+        entries = []
+        for entry in os.scandir(self._cache_dir):
+            if entry.name.endswith('.pkl'):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_size = sum([entry[1] for entry in entries])
+        for mtime, size, path in sorted(entries):
+            if total_size <= self._max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # already removed by another process
+                pass
+            total_size -= size
+
+        self._size = total_size
+
+    def clear(self):
+        """
+        remove all the data of the cache
+        """
+        for entry in os.scandir(self._cache_dir):
+            if entry.name.endswith('.pkl'):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+        self._size = 0
+
+    def parse(self, output, parser, **kwargs):
+        """
+        Parse a Q-Chem output using the cache
+
+        :param output: the Q-Chem output
+        :param parser: the parser function
+        :param kwargs: additional arguments of the parser
+        :return: parsed data
+        """
+        parser = getattr(parser, '__wrapped__', parser)
+        key = self.get_key(parser, output.encode(), kwargs)
+        data = self.load(key)
+        if data is None:
+            data = parser(output, **kwargs)
+            self.store(key, data)
+
+        return data
+
+    def parse_file(self, file_name, parser, **kwargs):
+        """
+        Parse a Q-Chem output file using the cache (see qcparsers.parsers.parse_file)
+
+        :param file_name: the Q-Chem output file name
+        :param parser: the parser function
+        :param kwargs: additional arguments of the parser
+        :return: parsed data
+        """
+        parser = getattr(parser, '__wrapped__', parser)
+        if self._fast:
+            stat = os.stat(file_name)
+            file_id = '{} {} {}'.format(os.path.abspath(file_name), stat.st_size, stat.st_mtime_ns).encode()
+        else:
+            with open(file_name, 'rb') as f:
+                file_id = f.read()
+
+        key = self.get_key(parser, file_id, kwargs)
+        data = self.load(key)
+        if data is None:
+            data = parse_file(file_name, parser, **kwargs)
+            self.store(key, data)
+
+        return data
+
+    def wrap(self, parser):
+        """
+        get a version of a parser that uses the cache
+
+        :param parser: the parser function
+        :return: the cached parser function
+        """
+        signature = inspect.signature(parser)
+
+        @functools.wraps(parser)
+        def cached_parser(output, *args, **kwargs):
+            if args:
+                arguments = signature.bind_partial(output, *args, **kwargs).arguments
+                kwargs = dict(list(arguments.items())[1:])
+            return self.parse(output, parser, **kwargs)
+
+        # used by parse_file to read the file using the cache
+        cached_parser.cache = self
+
+        return cached_parser
+
+
+def enable_cache(cache_dir=None, max_size=1024**3):
+    """
+    Replace the parsers of qcparsers.parsers by versions that use an on-disk cache
+
+    Only affects the parsers accessed through the qcparsers.parsers module after this call.
+
+    :param cache_dir: directory where the results are stored
+    :param max_size: maximum size of the cache in bytes
+    :return: the cache
+    """
+    disable_cache()
+
+    cache = ParserCache(cache_dir=cache_dir, max_size=max_size)
+    for name in dir(qcparsers.parsers):
+        if name.startswith('parser_'):
+            setattr(qcparsers.parsers, name, cache.wrap(getattr(qcparsers.parsers, name)))
+
+    return cache
+
+
+def disable_cache():
+    """
+    Restore the original parsers of qcparsers.parsers
+    """
+    for name in dir(qcparsers.parsers):
+        if name.startswith('parser_'):
+            parser = getattr(qcparsers.parsers, name)
+            setattr(qcparsers.parsers, name, getattr(parser, '__wrapped__', parser))
@@ -6,3 +6,39 @@ from qcparsers.parsers.irc import parser_irc
 from qcparsers.parsers.optimization import parser_optimization
 from qcparsers.parsers.rasci import parser_rasci
 
+from qcparsers.parsers.optimization import read_optimization_sections
+from qcparsers.parsers.irc import read_irc_sections
+from qcparsers.tools.stream import iter_file_sections
+
+
+# parsers that can read the output by sections: {parser: (section marker, sections reader)}
+sections_readers = {parser_optimization: ('Optimization Cycle', read_optimization_sections),
+                    parser_irc: ('Reaction path following', read_irc_sections)}
+
+
+def parse_file(file_name, parser, chunk_size=1024*1024, **kwargs):
+    """
+    Parse a Q-Chem output file
+
+    Parsers of outputs made of repeated sections (optimization cycles, IRC steps) read
+    the file in chunks and handle one section at a time, so the memory used is bounded
+    by the largest section instead of the file size. Other parsers read the whole file.
+
+    :param file_name: the Q-Chem output file name
+    :param parser: the parser function
+    :param chunk_size: size in bytes of the chunks read from the file
+    :param kwargs: additional arguments of the parser
+    :return: parsed data
+    """
+    if hasattr(parser, 'cache'):
+        # parser using a ParserCache (see qcparsers.cache)
+        return parser.cache.parse_file(file_name, parser.__wrapped__, **kwargs)
+
+    if parser in sections_readers:
+        marker, reader = sections_readers[parser]
+        return reader(iter_file_sections(file_name, marker, chunk_size=chunk_size), **kwargs)
+
+    with open(file_name, 'r') as f:
+        output = f.read()
+
+    return parser(output, **kwargs)
@@ -1,8 +1,10 @@
-from qcparsers.tools import search_bars
+from qcparsers.tools import search_bars, format_array
+from qcparsers.tools.index import OutputIndex
 from qcparsers.parsers.basic.support import get_orbital_energies
+import numpy as np
 
 
-def parser_basic(output):
+def parser_basic(output, as_arrays=False, index=None):
     """
     This showcases the format of  Q-Chem version parser compatibility.
     Just by creating a docstring with the following line:
@@ -11,17 +13,24 @@ def parser_basic(output):
 
     more text information can be added to the docstring
 
+    :param output: the Q-Chem output
+    :param as_arrays: return numerical data as numpy arrays instead of lists
+    :param index: OutputIndex of the output (shared between parsers)
+    :return: parsed data
     """
+    if index is None:
+        index = OutputIndex(output)
+
     data_dict = {}
 
     # scf_energy
-    enum = output.find('Total energy in the final basis set')
+    enum = index.find('Total energy in the final basis set')
     data_dict['scf_energy'] = float(output[enum:enum+100].split()[8])
     data_dict['scf_energy_units'] = 'au'
 
     # Orbitals energy
-    enum = output.find('Orbital Energies (a.u.)')
-    bars = search_bars(output, from_position=enum, bar_type='----')
+    enum = index.find('Orbital Energies (a.u.)')
+    bars = search_bars(output, from_position=enum, bar_type='----', n_bars=2)
     orbitals_section = output[enum:bars[1]]
 
     alpha_mos = orbitals_section.find('Alpha MOs')
@@ -36,17 +45,23 @@ def parser_basic(output):
         alpha_energies = get_orbital_energies(orbitals_section[alpha_mos:beta_mos])
         beta_energies = alpha_energies
 
+    if as_arrays:
+        # unknown energies (********) are set to NaN
+        alpha_energies = np.array(alpha_energies, dtype=float)
+        beta_energies = np.array(beta_energies, dtype=float)
+
     data_dict['orbital_energies'] = {'alpha': alpha_energies, 'beta': beta_energies, 'units': 'au'}
 
     # Mulliken Net Atomic Charges
-    enum = output.find('Ground-State Mulliken Net Atomic Charges')
-    bars = search_bars(output, from_position=enum, bar_type='----')
+    enum = index.find('Ground-State Mulliken Net Atomic Charges')
+    bars = search_bars(output, from_position=enum, bar_type='----', n_bars=2)
     mulliken_section = output[bars[0]:bars[1]]
-    data_dict['mulliken_charges'] = [float(line.split()[2]) for line in mulliken_section.split('\n')[1:-1]]
+    data_dict['mulliken_charges'] = format_array([float(line.split()[2]) for line in mulliken_section.split('\n')[1:-1]],
+                                                 as_arrays)
 
     # Multipole Moments
-    enum = output.find('Cartesian Multipole Moments')
-    bars = search_bars(output, from_position=enum, bar_type='----')
+    enum = index.find('Cartesian Multipole Moments')
+    bars = search_bars(output, from_position=enum, bar_type='----', n_bars=2)
     multipole_section = output[bars[0]: bars[1]]
     multipole_lines =  multipole_section.split('\n')[1:-1]
 
@@ -55,16 +70,18 @@ def parser_basic(output):
     multipole_dict['charge'] = float(multipole_lines[1])
     multipole_dict['charge_units'] = 'ESU x 10^10'
 
-    multipole_dict['dipole_moment'] = [float(val) for val in multipole_lines[3].split()[1::2]]
+    multipole_dict['dipole_moment'] = format_array([float(val) for val in multipole_lines[3].split()[1::2]],
+                                                   as_arrays)
     multipole_dict['dipole_units'] = 'Debye'
 
     quadrupole = [float(val) for val in multipole_lines[6].split()[1::2]] + \
                  [float(val) for val in multipole_lines[7].split()[1::2]]
 
     # create quadrupole array
-    multipole_dict['quadrupole_moment'] = [[quadrupole[0], quadrupole[1], quadrupole[2]],
-                                           [quadrupole[1], quadrupole[3], quadrupole[4]],
-                                           [quadrupole[2], quadrupole[4], quadrupole[5]]]
+    multipole_dict['quadrupole_moment'] = format_array([[quadrupole[0], quadrupole[1], quadrupole[2]],
+                                                        [quadrupole[1], quadrupole[3], quadrupole[4]],
+                                                        [quadrupole[2], quadrupole[4], quadrupole[5]]],
+                                                       as_arrays)
 
     # multipole_dict['quadrupole_moment'] = [float(val) for val in multipole_lines[6].split()[1::2]] + \
     #                                       [float(val) for val in multipole_lines[7].split()[1::2]]
@@ -78,7 +95,7 @@ def parser_basic(output):
                [float(val) for val in multipole_lines[12].split()[1::2]]
 
     # create octopole array
-    multipole_dict['octopole_moment'] = [
+    multipole_dict['octopole_moment'] = format_array([
         [[octopole[0], octopole[1], octopole[4]],
          [octopole[1], octopole[2], octopole[5]],
          [octopole[4], octopole[5], octopole[7]]],
@@ -90,7 +107,7 @@ def parser_basic(output):
         [[octopole[4], octopole[5], octopole[7]],
          [octopole[5], octopole[6], octopole[8]],
          [octopole[7], octopole[8], octopole[9]]],
-    ]
+    ], as_arrays)
 
     # multipole_dict['octopole_moment'] = [float(val) for val in multipole_lines[9].split()[1::2]] + \
     #                                     [float(val) for val in multipole_lines[10].split()[1::2]] + \
@@ -1,13 +1,16 @@
 from qcparsers.abstractions.molecule import Molecule
 from qcparsers.tools.errors import ParserError
 from qcparsers.tools.units import AU_TO_EV
-from qcparsers.tools import search_bars, standardize_vector, read_basic_info, get_cis_occupations_list
-from qcparsers.parsers.cis.support import list_to_complex
+from qcparsers.tools import search_bars, standardize_vector, read_basic_info, format_array
+from qcparsers.tools.index import OutputIndex
+from qcparsers.tools.elements import normalize_symbols
+from qcparsers.parsers.cis.support import read_soc_tables, get_soc_matrix, get_soc_pairs, get_configuration
+from qcparsers.parsers.cis.support import split_state_blocks, CompactConfigurations
 import numpy as np
 import re
 
 
-def parser_cis(output):
+def parser_cis(output, as_arrays=False, index=None, compact=False, amplitude_threshold=None):
     """
     Parser for CIS/TD-DFT calculations
 
@@ -18,18 +21,27 @@ def parser_cis(output):
     - SOC
 
     :param output: the Q-Chem output
+    :param as_arrays: return numerical data as numpy arrays instead of lists
+    :param index: OutputIndex of the output (shared between parsers)
+    :param compact: store the configurations of each state in arrays (CompactConfigurations) with the occupations
+                    packed in bits and decoded on access
+    :param amplitude_threshold: skip the configurations with smaller absolute amplitude (the amplitude stored
+                                in the configuration, the printed amplitude/sqrt(2) in the lines without spin)
     :return: parsed data
     """
+    if index is None:
+        index = OutputIndex(output)
+
     data_dict = {}
 
     # Molecule
-    n = output.find('$molecule')
-    n2 = output[n:].find('$end')
+    n = index.find('$molecule')
+    n2 = index.find('$end', n) - n
 
     molecule_region = output[n:n+n2-1].replace('\t', ' ').split('\n')[1:]
     charge, multiplicity = [int(num) for num in molecule_region[0].split()]
     coordinates = [[float(l) for l in line.split()[1:4]] for line in molecule_region[1:]]
-    symbols = [line.split()[0].capitalize() for line in molecule_region[1:]]
+    symbols = normalize_symbols([line.split()[0] for line in molecule_region[1:]])
     n_atoms = len(symbols)
 
     # structure
@@ -38,7 +50,7 @@ def parser_cis(output):
                                charge=charge,
                                multiplicity=multiplicity)
 
-    enum = output.find('Standard Nuclear Orientation')
+    enum = index.find('Standard Nuclear Orientation')
     section_structure = output[enum:enum + 200*structure_input.get_number_of_atoms()].split('\n')
     section_structure = section_structure[3:structure_input.get_number_of_atoms()+3]
     coordinates = [[float(num) for num in s.split()[2:]] for s in section_structure]
@@ -49,31 +61,29 @@ def parser_cis(output):
                                       multiplicity=multiplicity)
 
     # scf_energy
-    enum = output.find('Total energy in the final basis set')
+    enum = index.find('Total energy in the final basis set')
     try:
         data_dict['scf_energy'] = float(output[enum:enum+100].split()[8])
     except IndexError:
         pass
 
-    enum = output.find('Molecular Point Group')
-    basic_data = read_basic_info(output[enum:enum + 5000])
+    basic_data = read_basic_info(output, index=index)
 
     # CIS excited states
-    # enum = output.find('CIS Excitation Energies')
-    try:
-        enum = list(re.finditer('CIS Excitation Energies', output))[-1].end()
-    except IndexError:
-        enum = list(re.finditer('TDDFT/TDA Excitation Energies', output))[-1].end()
+    enum = -1
+    for label in ['CIS Excitation Energies', 'TDDFT/TDA Excitation Energies']:
+        enum = index.rfind(label)
+        if enum >= 0:
+            enum += len(label)
+            break
 
     excited_states = []
     if enum > 0:
-        bars = search_bars(output, from_position=enum)
+        bars = search_bars(output, from_position=enum, n_bars=2)
 
         output_cis = output[bars[0]:bars[1]]
 
-        for m in re.finditer('Excited state ', output_cis):
-            state_cis_section = output_cis[m.end():]
-            state_cis_lines = state_cis_section.split('\n')
+        for state_cis_lines in split_state_blocks(output_cis):
 
             exc_energy = float(state_cis_lines[0].split()[5])
             exc_energy_units = state_cis_lines[0].split()[3][1:-1]
@@ -89,7 +99,7 @@ def parser_cis(output):
                 strength = float(state_cis_lines[4].split()[2])
             except ValueError:
                 # old version of qchem (< 5.01)
-                state_cis_words = output_cis[m.end():].split()
+                state_cis_words = ' '.join(state_cis_lines).split()
                 tot_energy_units = 'au'
                 mul = state_cis_words[13]
                 trans_mom = [float(mom) for mom in [state_cis_words[16],
@@ -97,72 +107,65 @@ def parser_cis(output):
                                                     state_cis_words[20]]]
                 strength = float(state_cis_words[24])
 
-            transitions = []
+            configurations = []
             for line in state_cis_lines[5:]:
                 if line.find('-->') > 0:
                     origin = int(line.split('>')[0].split('(')[1].split(')')[0])
                     target = int(line.split('>')[1].split('(')[1].split(')')[0])
                     amplitude = float(line.split('=')[1])
 
-                    alpha_transitions = []
-                    beta_transitions = []
                     try:
                         spin = line[21:].split()[3]
                         if spin == 'alpha':
-                            alpha_transitions.append({'origin': origin, 'target': target + basic_data['n_alpha']})
+                            configurations.append((origin, target, 'alpha', amplitude, basic_data['n_alpha']))
                         elif spin == 'beta':
-                            beta_transitions.append({'origin': origin, 'target': target + basic_data['n_beta']})
+                            configurations.append((origin, target, 'beta', amplitude, basic_data['n_beta']))
                         else:
                             raise ParserError('basic_cis', 'Error reading configurations')
 
-                        transitions.append({'origin': origin,
-                                            'target': target,
-                                            'amplitude': amplitude,
-                                            'occupations': get_cis_occupations_list(basic_data['n_basis_functions'],
-                                                                                    basic_data['n_alpha'],
-                                                                                    basic_data['n_beta'],
-                                                                                    alpha_transitions=alpha_transitions,
-                                                                                    beta_transitions=beta_transitions)})
-
                     except (IndexError, ParserError):
                         # This supposes single electron transition
-                        alpha_transitions.append({'origin': origin, 'target': target + basic_data['n_alpha']})
-
-                        transitions.append({'origin': origin,
-                                            'target': target,
-                                            'amplitude': amplitude/np.sqrt(2),
-                                            'occupations': get_cis_occupations_list(basic_data['n_basis_functions'],
-                                                                                    basic_data['n_alpha'],
-                                                                                    basic_data['n_beta'],
-                                                                                    alpha_transitions=alpha_transitions,
-                                                                                    beta_transitions=beta_transitions)})
-
-                        transitions.append({'origin': origin,
-                                            'target': target,
-                                            'amplitude': amplitude/np.sqrt(2) if mul == 'Singlet' else -amplitude/np.sqrt(2),
-                                            'occupations': get_cis_occupations_list(basic_data['n_basis_functions'],
-                                                                                    basic_data['n_alpha'],
-                                                                                    basic_data['n_beta'],
-                                                                                    alpha_transitions=beta_transitions,
-                                                                                    beta_transitions=alpha_transitions)})
+                        configurations.append((origin, target, 'alpha', amplitude/np.sqrt(2), basic_data['n_alpha']))
+                        configurations.append((origin, target, 'beta',
+                                               amplitude/np.sqrt(2) if mul == 'Singlet' else -amplitude/np.sqrt(2),
+                                               basic_data['n_alpha']))
 
                 if len(line) < 5:
                     break
 
+            if amplitude_threshold is not None:
+                configurations = [configuration for configuration in configurations
+                                  if abs(configuration[3]) >= amplitude_threshold]
+
+            if compact:
+                transitions = CompactConfigurations(configurations, basic_data, as_arrays=as_arrays)
+            else:
+                transitions = [get_configuration(basic_data, *configuration, as_arrays=as_arrays)
+                               for configuration in configurations]
+
             excited_states.append({'total_energy': tot_energy,
                                    'total_energy_units': tot_energy_units,
                                    'excitation_energy': exc_energy,
                                    'excitation_energy_units': exc_energy_units,
                                    'multiplicity': mul,
-                                   'transition_moment': standardize_vector(trans_mom),
+                                   'transition_moment': format_array(standardize_vector(trans_mom), as_arrays),
                                    'strength': strength,
                                    'configurations': transitions})
 
     data_dict['excited_states'] = excited_states
 
+    if as_arrays:
+        data_dict['excited_states_arrays'] = {
+            'excitation_energy': np.array([state['excitation_energy'] for state in excited_states], dtype=float),
+            'total_energy': np.array([state['total_energy'] for state in excited_states], dtype=float),
+            'multiplicity': np.array([state['multiplicity'] for state in excited_states], dtype=str),
+            'transition_moment': np.array([state['transition_moment'] for state in excited_states],
+                                          dtype=float).reshape(-1, 3),
+            'strength': np.array([state['strength'] for state in excited_states], dtype=float)}
+
     # Spin-Orbit coupling
-    initial = output.find('*********SPIN-ORBIT COUPLING JOB BEGINS HERE*********')
-    final = output.find('*********SOC CODE ENDS HERE*********')
+    initial = index.find('*********SPIN-ORBIT COUPLING JOB BEGINS HERE*********')
+    final = index.find('*********SOC CODE ENDS HERE*********')
 
     data_interstate = {}
     if initial > 0:
@@ -197,82 +200,81 @@ def parser_cis(output):
 
         labels, n_triplet, n_singlet = label_states(excited_states)
 
-        for i, label in enumerate(labels):
-            data_interstate[(i+1, 0)] = {'1e_soc_mat': [0j, 0j, 0j], 'soc_units': 'cm-1'}
-            data_interstate[(0, i+1)] = {'1e_soc_mat': [0j, 0j, 0j], 'soc_units': 'cm-1'}
-            for j, label2 in enumerate(labels):
-                if (label[0] == 'S' or label2[0] == 'S') and (label[0] != label2[0]):
-                    data_interstate[(i+1, j+1)] = {'1e_soc_mat': [[0j, 0j, 0j]], 'soc_units': 'cm-1'}
-                elif label[0] == 'T' and label2[0] == 'T':
-                    data_interstate[(i+1, j+1)] = {'1e_soc_mat': [[0j, 0j, 0j], [0j, 0j, 0j], [0j, 0j, 0j]], 'soc_units': 'cm-1'}
-                elif label[0] == 'S' and label2[0] == 'S':
-                    data_interstate[(i+1, j+1)] = {'1e_soc_mat': [[0j]], 'soc_units': 'cm-1'}
-                else:
-                    raise ParserError('basic_cis', 'State multiplicity error')
+        tables = read_soc_tables(soc_section)
 
-        for i, label in enumerate(labels):
-            for k2, ms2 in enumerate([-1, 0, 1]):
+        if as_arrays:
+            data_dict['soc_matrix'], data_dict['soc_sublevels'] = get_soc_matrix(tables, labels)
+            data_interstate = get_soc_pairs(tables, labels)
+        else:
+            for i, label in enumerate(labels):
+                data_interstate[(i+1, 0)] = {'1e_soc_mat': [0j, 0j, 0j], 'soc_units': 'cm-1'}
+                data_interstate[(0, i+1)] = {'1e_soc_mat': [0j, 0j, 0j], 'soc_units': 'cm-1'}
                 for j, label2 in enumerate(labels):
-                    if label[0] == 'T':
-                        for k, ms in enumerate([-1, 0, 1]):
-                            enum = soc_section.find('SOC between the {} (ms={}) state and excited triplet states (ms={})'.format(label, ms2, ms))
-                            for line in soc_section[enum:enum+50*(n_triplet+1)].split('\n'):
-                                if len(line.split()) == 0:
-                                    break
-                                if line.split()[0] == '{}(ms={})'.format(label2, ms):
-                                    data_interstate[(i+1, j+1)]['1e_soc_mat'][k2][k] = list_to_complex(line.split()[1:4])
-                                    data_interstate[(i+1, j+1)]['1e_soc_mat'][k][k2] = list_to_complex(line.split()[1:4])
-                                    data_interstate[(j+1, i+1)]['1e_soc_mat'][k2][k] = list_to_complex(line.split()[1:4])
-                                    data_interstate[(j+1, i+1)]['1e_soc_mat'][k][k2] = list_to_complex(line.split()[1:4])
-                                    break
-
-                    elif label[0] == 'S':
-                        for k, ms in enumerate([-1, 0, 1]):
-                            enum = soc_section.find('SOC between the {} state and excited triplet states (ms={})'.format(label, ms))
-                            for line in soc_section[enum:enum+50*(n_triplet+1)].split('\n'):
-                                if len(line.split()) == 0:
-                                    break
-                                if line.split()[0] == '{}(ms={})'.format(label2, ms):
-                                    data_interstate[(i+1, j+1)]['1e_soc_mat'][0][k] = list_to_complex(line.split()[1:4])
-                                    data_interstate[(j+1, i+1)]['1e_soc_mat'][0][k] = list_to_complex(line.split()[1:4])
-                                    break
+                    if (label[0] == 'S' or label2[0] == 'S') and (label[0] != label2[0]):
+                        data_interstate[(i+1, j+1)] = {'1e_soc_mat': [[0j, 0j, 0j]], 'soc_units': 'cm-1'}
+                    elif label[0] == 'T' and label2[0] == 'T':
+                        data_interstate[(i+1, j+1)] = {'1e_soc_mat': [[0j, 0j, 0j], [0j, 0j, 0j], [0j, 0j, 0j]], 'soc_units': 'cm-1'}
+                    elif label[0] == 'S' and label2[0] == 'S':
+                        data_interstate[(i+1, j+1)] = {'1e_soc_mat': [[0j]], 'soc_units': 'cm-1'}
                     else:
-                        raise ParserError('basic_cis', 'SOC reading error')
+                        raise ParserError('basic_cis', 'State multiplicity error')
+
+            def get_soc(title, row):
+                return tables.get(title, {}).get(row)
+
+            for i, label in enumerate(labels):
+                for k2, ms2 in enumerate([-1, 0, 1]):
+                    for j, label2 in enumerate(labels):
+                        if label[0] == 'T':
+                            for k, ms in enumerate([-1, 0, 1]):
+                                soc = get_soc('SOC between the {} (ms={}) state and excited triplet states (ms={})'.format(label, ms2, ms),
+                                              '{}(ms={})'.format(label2, ms))
+                                if soc is not None:
+                                    data_interstate[(i+1, j+1)]['1e_soc_mat'][k2][k] = soc
+                                    data_interstate[(i+1, j+1)]['1e_soc_mat'][k][k2] = soc
+                                    data_interstate[(j+1, i+1)]['1e_soc_mat'][k2][k] = soc
+                                    data_interstate[(j+1, i+1)]['1e_soc_mat'][k][k2] = soc
+
+                        elif label[0] == 'S':
+                            for k, ms in enumerate([-1, 0, 1]):
+                                soc = get_soc('SOC between the {} state and excited triplet states (ms={})'.format(label, ms),
+                                              '{}(ms={})'.format(label2, ms))
+                                if soc is not None:
+                                    data_interstate[(i+1, j+1)]['1e_soc_mat'][0][k] = soc
+                                    data_interstate[(j+1, i+1)]['1e_soc_mat'][0][k] = soc
+                        else:
+                            raise ParserError('basic_cis', 'SOC reading error')
 
-                enum = soc_section.find('SOC between the singlet ground state and excited triplet states (ms={})'.format(ms2))
-                for line in soc_section[enum:enum+50*(n_triplet+1)].split('\n'):
-                    if len(line.split()) == 0:
-                        break
-                    if line.split()[0] == '{}(ms={})'.format(label, ms2):
-                        data_interstate[(i+1, 0)]['1e_soc_mat'][k2] = list_to_complex(line.split()[1:4])
-                        data_interstate[(0, i+1)]['1e_soc_mat'][k2] = list_to_complex(line.split()[1:4])
-                        break
+                    soc = get_soc('SOC between the singlet ground state and excited triplet states (ms={})'.format(ms2),
+                                  '{}(ms={})'.format(label, ms2))
+                    if soc is not None:
+                        data_interstate[(i+1, 0)]['1e_soc_mat'][k2] = soc
+                        data_interstate[(0, i+1)]['1e_soc_mat'][k2] = soc
 
         data_dict['interstate_properties'] = data_interstate
 
     # diabatization
-    initial = output.find('Localization Code for CIS excited states')
+    initial = index.find('Localization Code for CIS excited states')
     if initial > 0:
 
-        bars = search_bars(output, from_position=initial)
+        bars = search_bars(output, from_position=initial, n_bars=1)
         diabat_section = output[initial: bars[0]]
 
         def read_diabatization_matrix(label):
-            matrix = []
-            for m in re.finditer(label, diabat_section):
-                line = diabat_section[m.end(): m.end() + 50].split('\n')[0]
-                matrix.append(float(line.split('=')[1]))
+            values = [diabat_section[m.end(): m.end() + 50].split('\n')[0].split('=')[1]
+                      for m in re.finditer(label, diabat_section)]
 
+            matrix = np.array(values, dtype=float)
             diabat_dim = int(np.sqrt(len(matrix)))
-            return np.array(matrix).reshape(diabat_dim, diabat_dim).T
+            return matrix.reshape(diabat_dim, diabat_dim).T
 
         rot_matrix = read_diabatization_matrix('showmatrix adiabatic R-Matrix')
         adiabatic_matrix = read_diabatization_matrix('showmatrix adiabatH') * AU_TO_EV
         diabatic_matrix = read_diabatization_matrix('showmatrix diabatH') * AU_TO_EV
 
         diabat_data = {'rot_matrix': rot_matrix,
-                       'adiabatic_matrix': adiabatic_matrix.tolist(),
-                       'diabatic_matrix': diabatic_matrix.tolist()}
+                       'adiabatic_matrix': format_array(adiabatic_matrix, as_arrays),
+                       'diabatic_matrix': format_array(diabatic_matrix, as_arrays)}
 
         if diabat_section.find('showmatrix Total_Decomposed_H_diabatic'):
 
@@ -282,21 +284,21 @@ def parser_cis(output):
             decomp_k_matrix = read_diabatization_matrix('showmatrix Decomposed_K_diabatic') * AU_TO_EV
 
             diabat_data.update({'tot_decomp_matrix': tot_decomp_matrix,
-                                               'decomp_one_matrix': decomp_one_matrix.tolist(),
-                                               'decomp_j_matrix': decomp_j_matrix.tolist(),
-                                               'decomp_k_matrix': decomp_k_matrix.tolist()})
+                                               'decomp_one_matrix': format_array(decomp_one_matrix, as_arrays),
+                                               'decomp_j_matrix': format_array(decomp_j_matrix, as_arrays),
+                                               'decomp_k_matrix': format_array(decomp_k_matrix, as_arrays)})
 
         mulliken_diabatic = []
 
-        enum = output.find('Mulliken & Loewdin analysis of')
+        enum = index.find('Mulliken & Loewdin analysis of')
         for m in re.finditer('Mulliken analysis of TDA State', output[enum:]):
             section_mulliken = output[m.end() + enum: m.end() + 10000 + enum]  # 10000: assumed to max of section
             section_mulliken = section_mulliken[:section_mulliken.find('Natural Orbitals stored in FCHK')]
             section_attachment = section_mulliken.split('\n')[10 + n_atoms: 10 + n_atoms * 2]
 
-            mulliken_diabatic.append({'attach': [float(l.split()[1]) for l in section_attachment],
-                                      'detach': [float(l.split()[2]) for l in section_attachment],
-                                      'total': [float(l.split()[3]) for l in section_attachment]})
+            mulliken_diabatic.append({'attach': format_array([float(l.split()[1]) for l in section_attachment], as_arrays),
+                                      'detach': format_array([float(l.split()[2]) for l in section_attachment], as_arrays),
+                                      'total': format_array([float(l.split()[3]) for l in section_attachment], as_arrays)})
 
         diabatic_states = []
         for i in range(len(rot_matrix)):
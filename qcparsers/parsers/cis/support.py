@@ -1,3 +1,7 @@
+from qcparsers.tools import get_cis_occupations_list, format_array
+from collections.abc import Sequence
+import numpy as np
+import re
 
 
 def list_to_complex(list):
@@ -12,3 +16,252 @@ def list_to_complex(list):
     opera = float(list[1] + '1')
     return float(real) + opera * float(imag) * 1.j
 
+
+
+def split_state_blocks(section, marker='Excited state '):
+    """
+    Split the excited states section in the lines of each state in a single pass
+
+    :param section: the excited states section of the output
+    :param marker: text that starts the block of each state
+    :return: list with the lines of each state. The first line starts after the marker
+    """
+    blocks = []
+    for line in section.split('\n'):
+        position = line.find(marker)
+        if position >= 0:
+            blocks.append([line[position + len(marker):]])
+        elif len(blocks) > 0:
+            blocks[-1].append(line)
+
+    return blocks
+
+
+def read_soc_tables(soc_section):
+    """
+    Read all the 'SOC between ...' tables of the spin-orbit coupling section in a single pass
+
+    :param soc_section: the spin-orbit coupling section of the output
+    :return: dictionary {table title: {row label: complex SOC}}
+    """
+    tables = {}
+    table = None
+    for line in soc_section.split('\n'):
+        words = line.split()
+        if line.startswith('SOC between the '):
+            table = tables.setdefault(line.strip().rstrip(':'), {})
+        elif len(words) == 0 or words[0] == 'Total':
+            table = None
+        elif table is not None:
+            table.setdefault(words[0], list_to_complex(words[1:4]))
+
+    return tables
+
+
+# titles of the SOC tables: (regular expression, state label, ms of the state, ms of the rows)
+soc_titles = [(re.compile(r'SOC between the singlet ground state and excited triplet states \(ms=(-?\d+)\)$'), 'GS', None, 1),
+              (re.compile(r'SOC between the (\w+) \(ms=(-?\d+)\) state and excited triplet states \(ms=(-?\d+)\)$'), 1, 2, 3),
+              (re.compile(r'SOC between the (\w+) state and excited triplet states \(ms=(-?\d+)\)$'), 1, None, 2)]
+
+soc_row = re.compile(r'(\w+)\(ms=(-?\d+)\)$')
+
+
+def read_soc_title(title):
+    """
+    Read the state of a SOC table title
+
+    :param title: title of the SOC table
+    :return: state label ('GS' for the ground state), ms of the state (None if not printed) and ms of the rows
+    """
+    for pattern, label, ms, ms_rows in soc_titles:
+        match = pattern.match(title)
+        if match is not None:
+            return (label if isinstance(label, str) else match.group(label),
+                    None if ms is None else int(match.group(ms)),
+                    int(match.group(ms_rows)))
+
+    return None
+
+
+def get_soc_matrix(tables, labels):
+    """
+    Build the SOC matrix between the spin sublevels of the states
+
+    :param tables: SOC tables (from read_soc_tables)
+    :param labels: labels of the excited states (S1, T1, S2, ...)
+    :return: complex SOC matrix and list of the sublevels as (state, ms). State 0 is the ground state
+    """
+    sublevels = [(0, 0)]
+    for i, label in enumerate(labels):
+        sublevels += [(i+1, ms) for ms in ([-1, 0, 1] if label[0] == 'T' else [0])]
+
+    positions = {(labels[state-1] if state > 0 else 'GS', ms): n for n, (state, ms) in enumerate(sublevels)}
+
+    # indices and values of all the elements (in the order of the tables, the last one is kept)
+    rows, columns, values = [], [], []
+    for title, table in tables.items():
+        title_state = read_soc_title(title)
+        if title_state is None:
+            continue
+
+        state = (title_state[0], 0 if title_state[1] is None else title_state[1])
+        if state not in positions:
+            continue
+
+        for row, value in table.items():
+            match = soc_row.match(row)
+            if match is None or (match.group(1), int(match.group(2))) not in positions:
+                continue
+            i, j = positions[state], positions[(match.group(1), int(match.group(2)))]
+            rows += [i, j]
+            columns += [j, i]
+            values += [value, np.conj(value)]
+
+    soc_matrix = np.zeros((len(sublevels), len(sublevels)), dtype=complex)
+    soc_matrix[rows, columns] = values
+
+    return soc_matrix, sublevels
+
+
+def get_soc_pairs(tables, labels):
+    """
+    Build the interstate dictionary of the SOC between each pair of states. The SOC of the pairs are
+    views of two arrays (ground state and excited states) with the same values and shapes of the list output:
+    (3) with the ground state, (1, 3) between a singlet and a triplet (in both orders), (3, 3) between
+    triplets and (1, 1) between singlets
+
+    :param tables: SOC tables (from read_soc_tables)
+    :param labels: labels of the excited states (S1, T1, S2, ...)
+    :return: dictionary {(state_a, state_b): {'1e_soc_mat': SOC between the sublevels of the states}}
+    """
+    sizes = [3 if label[0] == 'T' else 1 for label in labels]
+    first = np.cumsum([0] + sizes)
+    states = {label: i for i, label in enumerate(labels)}
+
+    ground_soc = np.zeros((len(labels), 3), dtype=complex)
+    triplet_elements = []  # (i, k2, j, k, value) of the triplet-triplet elements
+    soc_elements = {}  # {(row, column): value} of the excited states SOC
+    for title, table in tables.items():
+        title_state = read_soc_title(title)
+        if title_state is None or abs(title_state[2]) > 1:
+            continue
+
+        label, ms, ms_rows = title_state
+        if label != 'GS' and (label not in states or label[0] != ('S' if ms is None else 'T')):
+            continue
+
+        for row, value in table.items():
+            match = soc_row.match(row)
+            if match is None or int(match.group(2)) != ms_rows or match.group(1) not in states:
+                continue
+
+            j, k = states[match.group(1)], ms_rows + 1
+            if label == 'GS':
+                ground_soc[j, k] = value
+            elif match.group(1)[0] != 'T':
+                continue
+            elif ms is None:
+                soc_elements[(first[states[label]], first[j] + k)] = value
+            elif abs(ms) <= 1:
+                triplet_elements.append((states[label], ms + 1, j, k, value))
+
+    # each triplet-triplet element is written in the four symmetric positions of both pairs
+    # in the order of the list output (the last one is kept)
+    for i, k2, j, k, value in sorted(triplet_elements, key=lambda element: element[:4]):
+        for a, b in [(k2, k), (k, k2)]:
+            soc_elements[(first[i] + a, first[j] + b)] = value
+            soc_elements[(first[j] + a, first[i] + b)] = value
+
+    soc = np.zeros((first[-1], first[-1]), dtype=complex)
+    if len(soc_elements) > 0:
+        soc[tuple(np.array(list(soc_elements.keys())).T)] = list(soc_elements.values())
+
+    interstate = {}
+    for i, label in enumerate(labels):
+        interstate[(i+1, 0)] = {'1e_soc_mat': ground_soc[i], 'soc_units': 'cm-1'}
+        interstate[(0, i+1)] = {'1e_soc_mat': ground_soc[i], 'soc_units': 'cm-1'}
+        for j, label2 in enumerate(labels):
+            # the singlet is always the row
+            a, b = (j, i) if label[0] == 'T' and label2[0] != 'T' else (i, j)
+            interstate[(i+1, j+1)] = {'1e_soc_mat': soc[first[a]:first[a+1], first[b]:first[b+1]],
+                                      'soc_units': 'cm-1'}
+
+    return interstate
+
+
+def get_configuration(basic_data, origin, target, spin, amplitude, offset, as_arrays=False):
+    """
+    Build the dictionary of a single excitation configuration
+
+    :param basic_data: basic info of the output (from read_basic_info)
+    :param origin: origin orbital
+    :param target: target orbital (virtual orbital number)
+    :param spin: spin of the excited electron ('alpha' or 'beta')
+    :param amplitude: amplitude of the configuration
+    :param offset: number of occupied orbitals added to the target to get the orbital index
+    :param as_arrays: return the occupations as numpy arrays instead of lists
+    :return: configuration dictionary
+    """
+    transitions = [{'origin': origin, 'target': target + offset}]
+
+    occupations = get_cis_occupations_list(basic_data['n_basis_functions'],
+                                           basic_data['n_alpha'],
+                                           basic_data['n_beta'],
+                                           alpha_transitions=transitions if spin == 'alpha' else [],
+                                           beta_transitions=transitions if spin == 'beta' else [])
+    if as_arrays:
+        occupations = {key: format_array(occupation, as_arrays) for key, occupation in occupations.items()}
+
+    return {'origin': origin,
+            'target': target,
+            'amplitude': amplitude,
+            'occupations': occupations}
+
+
+class CompactConfigurations(Sequence):
+    """
+    Configurations of an excited state stored in arrays. The occupations of all the configurations
+    are packed in bits in a single array and each configuration dictionary is built when it is accessed
+    """
+    def __init__(self, configurations, basic_data, as_arrays=False):
+        """
+        :param configurations: list of (origin, target, spin, amplitude, offset) of each configuration
+        :param basic_data: basic info of the output (from read_basic_info)
+        :param as_arrays: return the occupations as numpy arrays instead of lists
+        """
+        self._origin = np.array([configuration[0] for configuration in configurations], dtype=int)
+        self._target = np.array([configuration[1] for configuration in configurations], dtype=int)
+        self._beta = np.array([configuration[2] == 'beta' for configuration in configurations], dtype=int)
+        self._amplitude = np.array([configuration[3] for configuration in configurations], dtype=float)
+        offset = np.array([configuration[4] for configuration in configurations], dtype=int)
+        self._n_orbitals = basic_data['n_basis_functions']
+        self._as_arrays = as_arrays
+
+        # occupations [configuration, spin (alpha, beta), orbital]
+        occupations = np.zeros((len(self._origin), 2, self._n_orbitals), dtype=np.uint8)
+        occupations[:, 0, :basic_data['n_alpha']] = 1
+        occupations[:, 1, :basic_data['n_beta']] = 1
+
+        rows = np.arange(len(self._origin))
+        occupations[rows, self._beta, self._origin - 1] = 0
+        occupations[rows, self._beta, self._target + offset - 1] = 1
+
+        self._occupations = np.packbits(occupations, axis=-1)
+
+    def __len__(self):
+        return len(self._origin)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self[i] for i in range(*item.indices(len(self)))]
+
+        occupations = np.unpackbits(self._occupations[item], axis=-1, count=self._n_orbitals)
+
+        return {'origin': int(self._origin[item]),
+                'target': int(self._target[item]),
+                'amplitude': float(self._amplitude[item]),
+                'occupations': {'alpha': format_array(occupations[0], self._as_arrays),
+                                'beta': format_array(occupations[1], self._as_arrays)}}
+
+    def __repr__(self):
+        return 'CompactConfigurations(n_configurations={})'.format(len(self))
@@ -1,48 +1,53 @@
 from qcparsers.abstractions.molecule import Molecule
 from qcparsers.parsers.fchk.support import get_all_nato, get_all_nto, reformat_input, basis_format, vect_to_mat
+from qcparsers.parsers.fchk.support import FchkIndex, LazyDict, get_nato_arrays, get_nto_arrays
 import numpy as np
-from qcparsers.abstractions.basis import BasisSet
-
-def parser_fchk(output):
-
-    def convert_to_type(item_type, item):
-        item_types = {'I': int,
-                      'R': float}
-
-        if type(item) is list:
-            return [item_types[item_type](e) for e in item]
-        else:
-            return item_types[item_type](item)
+import mmap
+from qcparsers.abstractions.basis import BasisSet, intern_basis
+from qcparsers.abstractions.matrix import PackedSymmetricMatrix
+
+def parser_fchk(output, lazy=False, as_arrays=False, packed=False):
+    """
+    Parser for FCHK files
+
+    Include:
+    - Structure
+    - Basis set
+    - Molecular orbitals coefficients and energies
+    - Density, overlap and core Hamiltonian matrices
+    - Natural (transition) orbitals
+
+    :param output: the FCHK file content (file name if lazy is True)
+    :param lazy: map the file in memory and decode the large sections as numpy arrays on first access
+    :param as_arrays: return numerical data as numpy arrays instead of lists
+    :param packed: return the symmetric matrices (density, overlap..) as PackedSymmetricMatrix objects
+    :return: parsed data
+    """
 
     key_list = ['Charge', 'Multiplicity', 'Number of alpha electrons', 'Number of beta electrons',
                 'Atomic numbers', 'Current cartesian coordinates', 'Number of basis functions', 'Shell types',
                 'Number of primitives per shell', 'Shell to atom map', 'Primitive exponents',
-                'Contraction coefficients', 'P(S=P) Contraction coefficients', 'Alpha MO coefficients',
-                'Beta MO coefficients', 'Coordinates of each shell', 'Overlap Matrix',
-                'Core Hamiltonian Matrix', 'Alpha Orbital Energies', 'Beta Orbital Energies',
-                'Total SCF Density', 'Alpha NATO coefficients', 'Beta NATO coefficients',
-                'Alpha Natural Orbital occupancies', 'Beta Natural Orbital occupancies',
-                'Natural Transition Orbital occupancies', 'Natural Transition Orbital U coefficients',
-                'Natural Transition Orbital V coefficients'
+                'Contraction coefficients', 'P(S=P) Contraction coefficients', 'Coordinates of each shell'
                 ]
 
-    basis_set = output.split('\n')[1].split()[-1]
-    words_output = output.replace('\n', ' ').split()
+    if lazy:
+        with open(output, 'rb') as f:
+            output = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        new_line = b'\n'
+    else:
+        new_line = '\n'
+
+    enum = output.find(new_line) + 1
+    basis_set = output[enum:output.find(new_line, enum)].split()[-1]
+    if lazy:
+        basis_set = basis_set.decode()
+
+    index = FchkIndex(output)
 
     data = {}
-    nw = len(words_output)
     for key in key_list:
-        wc = len(key.split())
-        for i in range(nw):
-            word = ' '.join(words_output[i:i+wc])
-            if word == key:
-                item_type = words_output[i+wc]
-                if words_output[i + wc + 1] == 'N=':
-                    n_elements = int(words_output[i + wc + 2])
-                    data[word] = convert_to_type(item_type, words_output[i + wc + 3: i + wc + n_elements + 3])
-                else:
-                    data[word] = convert_to_type(item_type, words_output[i + wc + 1])
-                break
+        if key in index:
+            data[key] = index.read(key)
 
     bohr_to_angstrom = 0.529177249
 
@@ -57,63 +62,134 @@ def parser_fchk(output):
 
     #basis = basis_format(basis_set_name=basis_set,
 
-    basis = BasisSet(basis_set_name=basis_set,
-                         atomic_numbers=structure.get_atomic_numbers(),
-                         atomic_symbols=structure.get_symbols(),
-                         shell_type=data['Shell types'],
-                         n_primitives=data['Number of primitives per shell'],
-                         atom_map=data['Shell to atom map'],
-                         p_exponents=data['Primitive exponents'],
-                         c_coefficients=data['Contraction coefficients'],
-                         p_c_coefficients=data['P(S=P) Contraction coefficients'])
+    basis = intern_basis(BasisSet(basis_set_name=basis_set,
+                                  atomic_numbers=data['Atomic numbers'],
+                                  atomic_symbols=None,
+                                  shell_type=data['Shell types'],
+                                  n_primitives=data['Number of primitives per shell'],
+                                  atom_map=data['Shell to atom map'],
+                                  p_exponents=data['Primitive exponents'],
+                                  c_coefficients=data['Contraction coefficients'],
+                                  p_c_coefficients=data['P(S=P) Contraction coefficients']))
 
     nbas = data['Number of basis functions']
 
+    def section_loader(key, occurrence=0, shape=None, triangular=False):
+        def load():
+            array = index.read_array(key, occurrence)
+            if triangular:
+                matrix = PackedSymmetricMatrix(array)
+                return matrix if packed else matrix.get_dense()
+            if shape is not None:
+                return array.reshape(shape)
+            return array
+        return load
+
+    def section_dict(loaders):
+        if lazy:
+            return LazyDict(loaders)
+        if as_arrays:
+            return {key: load() for key, load in loaders.items()}
+        return {key: load().tolist() for key, load in loaders.items()}
+
     final_dict = {'structure': structure,
                   'basis': basis,
                   'number_of_electrons': {'alpha': data['Number of alpha electrons'],
                                           'beta': data['Number of beta electrons']}
                   }
 
-    if 'Alpha MO coefficients' in data:
-        final_dict['coefficients'] = {'alpha': np.array(data['Alpha MO coefficients']).reshape(nbas, nbas).tolist()}
-        final_dict['mo_energies'] = {'alpha': data['Alpha Orbital Energies']}
-
-    if 'Beta MO coefficients' in data:
-        final_dict['coefficients']['beta'] = np.array(data['Beta MO coefficients']).reshape(nbas, nbas).tolist()
-        final_dict['mo_energies']['beta'] = data['Beta Orbital Energies']
+    if 'Alpha MO coefficients' in index:
+        coefficients = {'alpha': section_loader('Alpha MO coefficients', shape=(nbas, nbas))}
+        mo_energies = {'alpha': section_loader('Alpha Orbital Energies')}
 
-    if 'Total SCF Density' in data:
-        final_dict['scf_density'] = vect_to_mat(data['Total SCF Density']).tolist()
+        if 'Beta MO coefficients' in index:
+            coefficients['beta'] = section_loader('Beta MO coefficients', shape=(nbas, nbas))
+            mo_energies['beta'] = section_loader('Beta Orbital Energies')
 
-    if 'Core Hamiltonian Matrix' in data:
-        final_dict['scf_density'] = vect_to_mat(data['Core Hamiltonian Matrix']).tolist()
+        final_dict['coefficients'] = section_dict(coefficients)
+        final_dict['mo_energies'] = section_dict(mo_energies)
 
-    if 'Overlap Matrix' in data:
-        final_dict['overlap'] = vect_to_mat(data['Overlap Matrix']).tolist()
+    matrices = {}
+    if 'Total SCF Density' in index:
+        matrices['scf_density'] = section_loader('Total SCF Density', triangular=True)
 
-    if 'Alpha NATO coefficients' in data:
-        final_dict['nato_coefficients'] = {'alpha': np.array(data['Alpha NATO coefficients']).reshape(nbas, nbas).tolist()}
-        final_dict['nato_occupancies'] = {'alpha': data['Alpha Natural Orbital occupancies']}
+    if 'Core Hamiltonian Matrix' in index:
+        matrices['scf_density'] = section_loader('Core Hamiltonian Matrix', triangular=True)
 
-    if 'Beta NATO coefficients' in data:
-        final_dict['nato_coefficients'].update({
-            'beta': np.array(data['Beta NATO coefficients']).reshape(nbas, nbas).tolist()})
-        final_dict['nato_occupancies'].update({'beta': data['Beta Natural Orbital occupancies']})
+    if 'Overlap Matrix' in index:
+        matrices['overlap'] = section_loader('Overlap Matrix', triangular=True)
 
-    # check multiple NATO (may be improved)
-    if 'Alpha NATO coefficients' in data:
-        nato_coefficients_list, nato_occupancies_list = get_all_nato(output)
+    if not lazy:
+        if packed:
+            final_dict.update({key: load() for key, load in matrices.items()})
+        else:
+            final_dict.update(section_dict(matrices))
+
+    if 'Alpha NATO coefficients' in index:
+        nato_coefficients = {'alpha': section_loader('Alpha NATO coefficients', shape=(nbas, nbas))}
+        nato_occupancies = {'alpha': section_loader('Alpha Natural Orbital occupancies')}
+
+        if 'Beta NATO coefficients' in index:
+            nato_coefficients['beta'] = section_loader('Beta NATO coefficients', shape=(nbas, nbas))
+            nato_occupancies['beta'] = section_loader('Beta Natural Orbital occupancies')
+
+        final_dict['nato_coefficients'] = section_dict(nato_coefficients)
+        final_dict['nato_occupancies'] = section_dict(nato_occupancies)
+
+    # multiple NATO/NTO (one per state)
+    if 'Alpha NATO coefficients' in index:
+        if lazy:
+            nato_coefficients_list = []
+            nato_occupancies_list = []
+            for i in range(index.get_number_of_sections('Alpha NATO coefficients')):
+                nato_coefficients = {'alpha': section_loader('Alpha NATO coefficients', i, shape=(nbas, nbas))}
+                nato_occupancies = {'alpha': section_loader('Alpha Natural Orbital occupancies', i)}
+                if i < index.get_number_of_sections('Beta NATO coefficients'):
+                    nato_coefficients['beta'] = section_loader('Beta NATO coefficients', i, shape=(nbas, nbas))
+                    nato_occupancies['beta'] = section_loader('Beta Natural Orbital occupancies', i)
+                nato_coefficients_list.append(LazyDict(nato_coefficients))
+                nato_occupancies_list.append(LazyDict(nato_occupancies))
+        elif as_arrays:
+            # views of the stacked (n_states, ...) arrays
+            nato_coefficients, nato_occupancies = get_nato_arrays(index)
+            nato_coefficients_list = [{spin: nato_coefficients[spin][i] for spin in nato_coefficients
+                                       if i < len(nato_coefficients[spin])}
+                                      for i in range(len(nato_coefficients['alpha']))]
+            nato_occupancies_list = [{spin: nato_occupancies[spin][i] for spin in nato_occupancies
+                                      if i < len(nato_occupancies[spin])}
+                                     for i in range(len(nato_occupancies['alpha']))]
+        else:
+            nato_coefficients_list, nato_occupancies_list = get_all_nato(index)
         if len(nato_occupancies_list) > 1:
             final_dict['nato_coefficients_multi'] = nato_coefficients_list
             final_dict['nato_occupancies_multi'] = nato_occupancies_list
 
-    if 'Natural Transition Orbital occupancies' in data:
-        nat_coefficients_list, nat_occupancies_list = get_all_nto(output)
+    if 'Natural Transition Orbital occupancies' in index:
+        if lazy:
+            nat_coefficients_list = []
+            nat_occupancies_list = []
+            for i in range(index.get_number_of_sections('Natural Transition Orbital occupancies')):
+                nat_coefficients_list.append(LazyDict({
+                    label: section_loader('Natural Transition Orbital {} coefficients'.format(label), i,
+                                          shape=(nbas, nbas))
+                    for label in ['U', 'V']
+                    if i < index.get_number_of_sections('Natural Transition Orbital {} coefficients'.format(label))}))
+                # occupancies are small and read at once
+                nat_occupancies_list.append(index.read_array('Natural Transition Orbital occupancies', i))
+        elif as_arrays:
+            # views of the stacked (n_states, ...) arrays
+            nat_coefficients, nat_occupancies = get_nto_arrays(index)
+            nat_coefficients_list = [{'U': u, 'V': v} for u, v in zip(nat_coefficients['U'], nat_coefficients['V'])]
+            nat_occupancies_list = list(nat_occupancies)
+        else:
+            nat_coefficients_list, nat_occupancies_list = get_all_nto(index)
         if len(nat_occupancies_list) > 1:
             final_dict['nto_coefficients_multi'] = nat_coefficients_list
             final_dict['nto_occupancies_multi'] = nat_occupancies_list
 
+    if lazy:
+        return LazyDict(matrices, values=final_dict)
+
     return final_dict
 
 
@@ -121,4 +197,4 @@ if __name__ == '__main__':
     a = parser_fchk(open('fchk_1.out').read())
     basis = a['basis']
 
-    print(basis.get_qc_format())
\ No newline at end of file
+    print(basis.get_qc_format())
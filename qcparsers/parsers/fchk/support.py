@@ -1,4 +1,138 @@
 import numpy as np
+import re
+from qcparsers.abstractions.matrix import PackedSymmetricMatrix
+from qcparsers.tools import LazyDict
+
+
+_fchk_header = r'^(\S[^\n]*?)[ \t]+([IRCLH])[ \t]+(N=)?[ \t]*(\S+)[ \t]*\r?$'
+
+
+class FchkIndex:
+    """
+    Index of the sections in a FCHK file
+
+    The text is scanned once to locate every section header (name, type, number of
+    elements and position of the data). Section data is only decoded when requested.
+    """
+    def __init__(self, output):
+        """
+        :param output: FCHK file content (string or bytes-like object)
+        """
+        self._output = output
+        self._binary = not isinstance(output, str)
+        self._sections = {}
+
+        pattern = _fchk_header.encode() if self._binary else _fchk_header
+
+        previous = None
+        for m in re.finditer(pattern, output, flags=re.M):
+            if previous is not None:
+                previous[3] = m.start()
+
+            name, item_type, array_mark, value = m.groups()
+            if self._binary:
+                name, item_type = name.decode(), item_type.decode()
+
+            if array_mark:
+                # [type, number of elements, data start, data end]
+                entry = [item_type, int(value), m.end(), len(output)]
+                previous = entry
+            else:
+                # [type, None, scalar value, None]
+                entry = [item_type, None, value, None]
+                previous = None
+
+            self._sections.setdefault(name, []).append(entry)
+
+    def __contains__(self, name):
+        return name in self._sections
+
+    def keys(self):
+        return self._sections.keys()
+
+    def get_number_of_sections(self, name):
+        """
+        get the number of times a section appears in the file
+
+        :param name: section name
+        :return: number of sections
+        """
+        return len(self._sections.get(name, []))
+
+    def get_header(self, name, occurrence=0):
+        """
+        get the header information of a section
+
+        :param name: section name
+        :param occurrence: index of the section if repeated
+        :return: item type, number of elements (None for scalars)
+        """
+        item_type, n_elements = self._sections[name][occurrence][:2]
+        return item_type, n_elements
+
+    def get_words(self, name, occurrence=0):
+        """
+        get the undecoded words of a section
+
+        :param name: section name
+        :param occurrence: index of the section if repeated
+        :return: list of words (a single word for scalars)
+        """
+        item_type, n_elements, start, end = self._sections[name][occurrence]
+        if n_elements is None:
+            return start
+        return self._output[start:end].split()[:n_elements]
+
+    def read(self, name, occurrence=0):
+        """
+        decode a section into python types
+
+        :param name: section name
+        :param occurrence: index of the section if repeated
+        :return: list of values (single value for scalars)
+        """
+        item_type = self._sections[name][occurrence][0]
+        item_types = {'I': int,
+                      'R': float}
+
+        words = self.get_words(name, occurrence)
+        if isinstance(words, list):
+            return [item_types[item_type](e) for e in words]
+        else:
+            return item_types[item_type](words)
+
+    def read_array(self, name, occurrence=0):
+        """
+        decode a section into a numpy array
+
+        :param name: section name
+        :param occurrence: index of the section if repeated
+        :return: numpy array
+        """
+        item_type = self._sections[name][occurrence][0]
+        item_types = {'I': int,
+                      'R': float}
+
+        return np.array(self.get_words(name, occurrence), dtype=item_types[item_type])
+
+    def read_all_arrays(self, name):
+        """
+        decode all the repetitions of a section into a stacked numpy array
+
+        :param name: section name
+        :return: numpy array of shape (number of sections, number of elements)
+        """
+        n_sections = self.get_number_of_sections(name)
+        if n_sections == 0:
+            return np.zeros((0, 0))
+
+        first = self.read_array(name)
+        stacked = np.empty((n_sections, len(first)), dtype=first.dtype)
+        stacked[0] = first
+        for i in range(1, n_sections):
+            stacked[i] = self.read_array(name, i)
+
+        return stacked
 
 
 def basis_format(basis_set_name,
@@ -98,72 +232,80 @@ def reformat_input(array):
 
 
 def vect_to_mat(vector):
-    n = int(np.sqrt(0.25 + 2 * len(vector)) - 0.5)
+    return PackedSymmetricMatrix(vector).get_dense()
 
-    k = 0
-    matrix = np.zeros([n, n])
-    for i in range(n):
-        for j in range(0, i+1):
-            matrix[i, j] = vector[k + j]
-            matrix[j, i] = vector[k + j]
-        k += i+1
 
-    return matrix
+def get_nato_arrays(output):
+    """
+    Read all the natural orbitals (NATO) sections of a FCHK file
 
+    :param output: FCHK file content or FchkIndex
+    :return: coefficients {'alpha', 'beta'}: (n_states, nbas, nbas) and occupancies {'alpha', 'beta'}: (n_states, nbas)
+    """
+    index = output if isinstance(output, FchkIndex) else FchkIndex(output)
 
-def get_all_nato(output):
-    import re
+    nato_coefficients = {}
+    nato_occupancies = {}
+    for spin in ['Alpha', 'Beta']:
+        if '{} NATO coefficients'.format(spin) not in index:
+            continue
+
+        coefficients = index.read_all_arrays('{} NATO coefficients'.format(spin))
+        nbas = int(np.sqrt(coefficients.shape[1]))
+        nato_coefficients[spin.lower()] = coefficients.reshape(-1, nbas, nbas)
+        nato_occupancies[spin.lower()] = index.read_all_arrays('{} Natural Orbital occupancies'.format(spin))
+
+    return nato_coefficients, nato_occupancies
 
-    nato_coefficients_list = []
-    nato_occupancies_list = []
 
-    for m in re.finditer('Alpha NATO coefficients', output):
-        n_elements = int(output[m.end():m.end() + 100].replace('\n', ' ').split()[2])
-        nbas = int(np.sqrt(n_elements))
-        data = output[m.end(): m.end() + n_elements*50].split()[3:n_elements+3]
-        nato_coefficients_list.append({'alpha': np.array(data, dtype=float).reshape(nbas, nbas).tolist()})
+def get_nto_arrays(output):
+    """
+    Read all the natural transition orbitals (NTO) sections of a FCHK file
 
-    for m in re.finditer('Alpha Natural Orbital occupancies', output):
-        n_elements = int(output[m.end():m.end() + 100].replace('\n', ' ').split()[2])
-        data = output[m.end(): m.end() + n_elements*50].split()[3:n_elements+3]
-        nato_occupancies_list.append({'alpha': np.array(data, dtype=float).tolist()})
+    :param output: FCHK file content or FchkIndex
+    :return: coefficients {'U', 'V'}: (n_states, nbas, nbas) and occupancies (n_states, nbas)
+             (arrays with no states for the sections not in the file)
+    """
+    index = output if isinstance(output, FchkIndex) else FchkIndex(output)
 
-    for i, m in enumerate(re.finditer('Beta NATO coefficients', output)):
-        n_elements = int(output[m.end():m.end() + 100].replace('\n', ' ').split()[2])
-        nbas = int(np.sqrt(n_elements))
-        data = output[m.end(): m.end() + n_elements*50].split()[3:n_elements+3]
-        nato_coefficients_list[i]['beta'] = np.array(data, dtype=float).reshape(nbas, nbas).tolist()
+    nto_coefficients = {}
+    for label in ['U', 'V']:
+        if 'Natural Transition Orbital {} coefficients'.format(label) not in index:
+            nto_coefficients[label] = np.zeros((0, 0, 0))
+            continue
 
-    for i, m in enumerate(re.finditer('Beta Natural Orbital occupancies', output)):
-        n_elements = int(output[m.end():m.end() + 100].replace('\n', ' ').split()[2])
-        data = output[m.end(): m.end() + n_elements*50].split()[3:n_elements+3]
-        nato_occupancies_list[i]['beta'] = np.array(data, dtype=float).tolist()
+        coefficients = index.read_all_arrays('Natural Transition Orbital {} coefficients'.format(label))
+        nbas = int(np.sqrt(coefficients.shape[1]))
+        nto_coefficients[label] = coefficients.reshape(-1, nbas, nbas)
 
-    return nato_coefficients_list, nato_occupancies_list
+    nto_occupancies = index.read_all_arrays('Natural Transition Orbital occupancies')
 
+    return nto_coefficients, nto_occupancies
 
-def get_all_nto(output):
-    import re
 
-    nto_coefficients_list = []
-    nto_occupancies_list = []
+def get_all_nato(output):
 
-    for m in re.finditer('Natural Transition Orbital U coefficients', output):
-        n_elements = int(output[m.end():m.end() + 100].replace('\n', ' ').split()[2])
-        nbas = int(np.sqrt(n_elements))
-        data = output[m.end(): m.end() + n_elements*50].split()[3:n_elements+3]
-        nto_coefficients_list.append({'U': np.array(data, dtype=float).reshape(nbas, nbas).tolist()})
+    nato_coefficients, nato_occupancies = get_nato_arrays(output)
 
-    for m in re.finditer('Natural Transition Orbital occupancies', output):
-        n_elements = int(output[m.end():m.end() + 100].replace('\n', ' ').split()[2])
-        data = output[m.end(): m.end() + n_elements*50].split()[3:n_elements+3]
-        nto_occupancies_list.append(np.array(data, dtype=float).tolist())
+    nato_coefficients_list = []
+    nato_occupancies_list = []
+    for i in range(len(nato_occupancies.get('alpha', []))):
+        nato_coefficients_list.append({'alpha': nato_coefficients['alpha'][i].tolist()})
+        nato_occupancies_list.append({'alpha': nato_occupancies['alpha'][i].tolist()})
 
-    for i, m in enumerate(re.finditer('Natural Transition Orbital V coefficients', output)):
-        n_elements = int(output[m.end():m.end() + 100].replace('\n', ' ').split()[2])
-        nbas = int(np.sqrt(n_elements))
-        data = output[m.end(): m.end() + n_elements*50].split()[3:n_elements+3]
-        nto_coefficients_list[i]['V'] = np.array(data, dtype=float).reshape(nbas, nbas).tolist()
+    for i in range(len(nato_occupancies.get('beta', []))):
+        nato_coefficients_list[i]['beta'] = nato_coefficients['beta'][i].tolist()
+        nato_occupancies_list[i]['beta'] = nato_occupancies['beta'][i].tolist()
 
-    return nto_coefficients_list, nto_occupancies_list
+    return nato_coefficients_list, nato_occupancies_list
+
+
+def get_all_nto(output):
 
+    nto_coefficients, nto_occupancies = get_nto_arrays(output)
+
+    nto_coefficients_list = [{'U': u.tolist(), 'V': v.tolist()}
+                             for u, v in zip(nto_coefficients['U'], nto_coefficients['V'])]
+    nto_occupancies_list = nto_occupancies.tolist()
+
+    return nto_coefficients_list, nto_occupancies_list
@@ -1,8 +1,16 @@
+from qcparsers.tools import format_array, read_block_matrix
+from qcparsers.tools.index import OutputIndex
+from qcparsers.tools.elements import normalize_symbols
 import numpy as np
 import re
 
 
-def parser_frequencies(output, print_data=False):
+# keys of the additional rows of the modes
+extra_row_keys = {'Raman Intens': 'raman_intensity',
+                  'Depolar': 'depolarization_ratio'}
+
+
+def parser_frequencies(output, print_data=False, as_arrays=False, index=None):
     """
     Parser for frequencies calculations
 
@@ -13,92 +21,53 @@ def parser_frequencies(output, print_data=False):
     - Force constants
 
     :param output: the Q-Chem output
+    :param as_arrays: return numerical data as numpy arrays instead of lists and also return the displacements
+                      of all the modes as an array [n_modes, n_atoms, 3] (displacements)
+    :param index: OutputIndex of the output (shared between parsers)
     :return: parsed data
     """
+    if index is None:
+        index = OutputIndex(output)
 
     # Coordinates
-    n = output.find('$molecule')
-    n2 = output[n:].find('$end')
+    n = index.find('$molecule')
+    n2 = index.find('$end', n) - n
     molecule_region = output[n:n+n2-1].replace('\t', ' ').split('\n')[1:]
     coordinates = np.array([ np.array(line.split()[1:4], dtype=float) for line in molecule_region[1:]])
-    symbols = [line.split()[0].capitalize() for line in molecule_region[1:]]
+    symbols = normalize_symbols([line.split()[0] for line in molecule_region[1:]])
     n_atoms = len(coordinates)
 
     # Energy
-    n = output.find('Total energy in the final basis set =')
+    n = index.find('Total energy in the final basis set')
     energy = float(output[n:n+70].split()[8])
 
-    n_hess = output.find('Hessian of the SCF Energy')
-    n_van = output.find('VIBRATIONAL ANALYSIS')
+    n_hess = index.find('Hessian of the SCF Energy')
+    n_van = index.find('VIBRATIONAL ANALYSIS')
 
     # Hessian
-    ncol = 6
-    ndim = n_atoms * 3
-    hessian_section = output[n_hess: n_van]
-    hess_block = hessian_section.split('\n')[1:]
-
-    hessian = []
-    for i in range(ndim):
-        line = []
-        for block in range((ndim-1)//ncol + 1):
-            line += hess_block[block*(ndim+1) + i +1].split()[1:]
-        hessian.append(line)
-
-    hessian = np.array(hessian, dtype=float).tolist()
+    hessian = format_array(read_hessian(output[n_hess: n_van], n_atoms * 3), as_arrays)
 
     # Vibration analysis
     vibration_section = output[n_van:]
 
-    frequencies = []
-    force_constants = []
-    red_mass = []
-    ir_active = []
-    ir_intens = []
-    raman_active = []
-
-    for m in re.finditer('Frequency:', vibration_section):
-        end_line = vibration_section[m.end():].find('\n')
-        frequencies += vibration_section[m.end():m.end()+end_line].split()[:3]
-
-    for m in re.finditer('Force Cnst:', vibration_section):
-        end_line = vibration_section[m.end():].find('\n')
-        force_constants += vibration_section[m.end():m.end()+end_line].split()[:3]
-
-    for m in re.finditer('Red. Mass:', vibration_section):
-        end_line = vibration_section[m.end():].find('\n')
-        red_mass += vibration_section[m.end():m.end()+end_line].split()[:3]
-
-    for m in re.finditer('IR Active:', vibration_section):
-        end_line = vibration_section[m.end():].find('\n')
-        ir_active += vibration_section[m.end():m.end()+end_line].split()[:3]
-
-    for m in re.finditer('IR Intens:', vibration_section):
-        end_line = vibration_section[m.end():].find('\n')
-        ir_intens += vibration_section[m.end():m.end()+end_line].split()[:3]
-
-    for m in re.finditer('Raman Active:', vibration_section):
-        end_line = vibration_section[m.end():].find('\n')
-        raman_active += vibration_section[m.end():m.end()+end_line].split()[:3]
-
-    frequencies = [float(n) for n in frequencies]
-    force_constants = [float(n) for n in force_constants]
-    red_mass = [float(n) for n in red_mass]
-    ir_active = [bool(n) for n in ir_active]
-    ir_intens = [float(n) for n in ir_intens]
-    raman_active = [bool(n) for n in raman_active]
-
-    displacements = []
-    for i, line in enumerate(vibration_section.split('\n')):
-        if 'X      Y      Z' in line:
-            disp_coordinate = []
-            for j in range(n_atoms):
-                coor_lines = vibration_section.split('\n')[j+ i+ 1]
-                disp_coordinate.append(coor_lines.split()[1:])
-
-            disp_coordinate = np.array(disp_coordinate, dtype=float)#.reshape(n_atoms, -1)
-            # print(nm_coordinate.shape[1], nm_coordinate.shape[1]//3)
-
-            displacements += [disp_coordinate[:, i*3:(i+1)*3].tolist() for i in range(disp_coordinate.shape[1]//3)]
+    rows, displacements = read_vibrational_analysis(vibration_section, n_atoms)
+
+    frequencies = [float(n) for n in rows.pop('Frequency', [])]
+    force_constants = [float(n) for n in rows.pop('Force Cnst', [])]
+    red_mass = [float(n) for n in rows.pop('Red. Mass', [])]
+    ir_active = [bool(n) for n in rows.pop('IR Active', [])]
+    ir_intens = [float(n) for n in rows.pop('IR Intens', [])]
+    raman_active = [bool(n) for n in rows.pop('Raman Active', [])]
+
+    # additional rows (Raman intensities, depolarization ratios, etc.)
+    rows.pop('Mode', None)
+    extra_rows = {}
+    for label, values in rows.items():
+        key = extra_row_keys.get(label, re.sub('[^a-z0-9]+', '_', label.lower()).strip('_'))
+        try:
+            extra_rows[key] = [float(n) for n in values]
+        except ValueError:
+            extra_rows[key] = values
 
     modes = []
     for i in range(len(frequencies)):
@@ -112,8 +81,69 @@ def parser_frequencies(output, print_data=False):
                       'ir_intensity': ir_intens[i],
                       'ir_intensity_units': 'KM/mol',
                       'raman_active': raman_active[i],
-                      'displacement': displacements[i]})
+                      'displacement': format_array(displacements[i], as_arrays)})
+
+        for key, values in extra_rows.items():
+            if i < len(values):
+                modes[i][key] = values[i]
+
+    data_dict = {'modes': modes,
+                 'hessian': hessian,
+                 'scf_energy': energy}
+
+    if as_arrays:
+        data_dict['displacements'] = displacements
+
+    return data_dict
+
 
-    return {'modes': modes,
-            'hessian': hessian,
-            'scf_energy': energy}
+def read_hessian(hessian_section, ndim, ncol=6):
+    """
+    Read the Hessian matrix printed in blocks of columns
+
+    :param hessian_section: text of the Hessian section (starting at its title line)
+    :param ndim: dimension of the Hessian (3 x number of atoms)
+    :param ncol: (minimum) number of columns of each block
+    :return: numpy array [ndim, ndim]
+    """
+    lines = hessian_section.split('\n', (ndim + 1) * ((ndim - 1) // ncol + 1) + 1)
+    return read_block_matrix(lines[1:], ndim)
+
+
+def read_vibrational_analysis(vibration_section, n_atoms):
+    """
+    Read the data of the normal modes in a single pass over the vibrational analysis section
+
+    :param vibration_section: text of the vibrational analysis section
+    :param n_atoms: number of atoms
+    :return: dictionary {row label: list of values of each mode} and displacements array [n_modes, n_atoms, 3]
+    """
+    header = 'X      Y      Z'
+
+    rows = {}
+    blocks = []
+    in_mode = False
+
+    lines = vibration_section.split('\n')
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+
+        if in_mode and header in line:
+            values = np.array([row.split()[1:] for row in lines[i+1: i+1+n_atoms]], dtype=float)
+            blocks.append(values.reshape(n_atoms, -1, 3).transpose(1, 0, 2))
+            in_mode = False
+            i += n_atoms + 1
+            continue
+
+        label, colon, values = line.partition(':')
+        label = label.strip()
+        if colon and (in_mode or label == 'Mode'):
+            in_mode = True
+            rows.setdefault(label, []).extend(values.split()[:3])
+        i += 1
+
+    if len(blocks) == 0:
+        return rows, np.zeros((0, n_atoms, 3))
+
+    return rows, np.concatenate(blocks)
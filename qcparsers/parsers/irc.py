@@ -1,9 +1,11 @@
 from qcparsers.abstractions.molecule import Molecule
+from qcparsers.abstractions.trajectory import Trajectory
+from qcparsers.tools import read_input_molecule
+from qcparsers.tools.stream import iter_file_sections, iter_section_bounds
 import numpy as np
-import re
 
 
-def parser_irc(output):
+def parser_irc(output, as_arrays=False, as_trajectory=False):
     """
     Parser for IRC
 
@@ -12,58 +14,201 @@ def parser_irc(output):
     - IRC backward trajectory (energy, structure)
 
     :param output: the Q-Chem output
+    :param as_arrays: also return the data of each branch as numpy arrays (irc_forward_arrays, irc_backward_arrays)
+    :param as_trajectory: return each IRC branch as a Trajectory (its data are numpy arrays)
     :return: parsed data
     """
+    marker = 'Reaction path following'
 
-    branch_mark = True
-    data_dict = {}
-    # Molecule
-    n = output.find('$molecule')
-    n2 = output[n:].find('$end')
+    bounds = iter_section_bounds(output, marker)
+    next(bounds)
+    steps = ((output, start + len(marker), end) for start, end in bounds)
 
-    molecule_region = output[n:n+n2-1].replace('\t', ' ').split('\n')[1:]
-    charge, multiplicity = [int(num) for num in molecule_region[0].split()]
-    coordinates = np.array([np.array(line.split()[1:4], dtype=float) for line in molecule_region[1:]])
-    symbols = [line.split()[0].capitalize() for line in molecule_region[1:]]
-    n_atoms = len(coordinates)
+    if as_trajectory:
+        return collect_irc_trajectories(output, steps)
 
-    forward_steps = []
-    backward_steps = []
+    return collect_irc_steps(read_irc_steps(output, steps), as_arrays=as_arrays)
+
+
+def read_irc_sections(sections, as_arrays=False, as_trajectory=False):
+    """
+    Parse an IRC from the output split in sections at each 'Reaction path following'
+
+    :param sections: iterable of (offset, text). The first section contains the input
+    :param as_arrays: also return the data of each branch as numpy arrays (irc_forward_arrays, irc_backward_arrays)
+    :param as_trajectory: return each IRC branch as a Trajectory (its data are numpy arrays)
+    :return: parsed data
+    """
+    marker = 'Reaction path following'
+
+    sections = iter(sections)
+    header = next(sections)[1]
+    steps = ((section, len(marker), len(section)) for offset, section in sections)
+
+    if as_trajectory:
+        return collect_irc_trajectories(header, steps)
+
+    return collect_irc_steps(read_irc_steps(header, steps), as_arrays=as_arrays)
+
+
+def iter_irc_steps(output=None, file_name=None):
+    """
+    Iterate over the steps of an IRC one at a time
 
-    list_iterations = [l.end() for l in re.finditer('Reaction path following', output)]
-    for ini, fin in zip(list_iterations, list_iterations[1:] + [len(output)]):
-        step_section = output[ini:fin]
-        enum = step_section.find('Standard Nuclear Orientation')
-        atoms_list = step_section[enum:].split('\n')[3:n_atoms+3]
-        coordinates_step = np.array([atom.split()[2:] for atom in atoms_list], dtype=float).tolist()
+    :param output: the Q-Chem output
+    :param file_name: the Q-Chem output file name (read by sections, used instead of output)
+    :return: generator of dictionaries with the molecule, energy and branch ('forward' or 'backward') of each step
+    """
+    marker = 'Reaction path following'
+
+    if file_name is not None:
+        sections = iter_file_sections(file_name, marker)
+        header = next(sections)[1]
+        steps = ((section, len(marker), len(section)) for offset, section in sections)
+    elif output is not None:
+        bounds = iter_section_bounds(output, marker)
+        next(bounds)
+        header = output
+        steps = ((output, start + len(marker), end) for start, end in bounds)
+    else:
+        raise ValueError('output or file_name is required')
+
+    for step in read_irc_steps(header, steps):
+        yield step
 
-        step_energy = None
-        for l in re.finditer('Total energy in the final basis set', step_section):
-            step_energy = float(step_section[l.end(): l.end()+50].split()[1])
 
+def read_irc_steps(header, steps):
+    """
+    Read the IRC steps
+
+    :param header: text containing the input molecule
+    :param steps: iterable of (text, start, end) with the position of each step in the text
+    :return: generator of dictionaries with the molecule, energy and branch of each step
+    """
+    charge, multiplicity, symbols, coordinates = read_input_molecule(header)
+
+    for coordinates_step, step_energy, branch in read_irc_branches(steps, len(coordinates)):
         step_molecule = Molecule(coordinates=coordinates_step,
                                  symbols=symbols,
                                  charge=charge,
                                  multiplicity=multiplicity)
 
-        if (step_section.find('IRC -- maximum number of cycles reached') > 0
-                or step_section.find('IRC -- convergence criterion reached') > 0):
-            if branch_mark:
-                #forward_steps = forward_steps[::-1]
-                branch_mark = False
+        yield {'molecule': step_molecule,
+               'energy': step_energy,
+               'branch': branch}
+
+
+def read_irc_branches(steps, n_atoms):
+    """
+    Read the coordinates and energy of the IRC steps and assign them to a branch
+
+    :param steps: iterable of (text, start, end) with the position of each step in the text
+    :param n_atoms: number of atoms
+    :return: generator of (coordinates, energy, branch) of each step
+    """
+    branch = 'forward'
+    for text, start, end in steps:
+        coordinates_step, step_energy, end_of_branch = read_irc_step(text, n_atoms, start, end)
+
+        if end_of_branch:
+            if branch == 'forward':
+                branch = 'backward'
             else:
                 break
 
-        if branch_mark:
-            forward_steps.append({'molecule': step_molecule,
-                                  'energy': step_energy,
-                                  })
+        yield coordinates_step, step_energy, branch
+
+
+def read_irc_step(text, n_atoms, start=0, end=None):
+    """
+    Read the data of one IRC step without copying the step section
+
+    :param text: the text that contains the step
+    :param n_atoms: number of atoms
+    :param start: position of the start of the step
+    :param end: position of the end of the step
+    :return: coordinates, energy (None if not found) and True if the step ends an IRC branch
+    """
+    if end is None:
+        end = len(text)
+
+    atoms_list = []
+    enum = text.find('Standard Nuclear Orientation', start, end)
+    if enum >= 0:
+        lines_end = enum
+        for i in range(n_atoms + 3):
+            lines_end = text.find('\n', lines_end, end) + 1
+            if lines_end == 0:
+                lines_end = end
+                break
+        atoms_list = text[enum:lines_end].split('\n')[3:n_atoms+3]
+    coordinates_step = np.array([atom.split()[2:] for atom in atoms_list], dtype=float)
+
+    step_energy = None
+    label = 'Total energy in the final basis set'
+    enum = text.rfind(label, start, end)
+    if enum >= 0:
+        step_energy = float(text[enum + len(label): enum + len(label) + 50].split()[1])
+
+    end_of_branch = (text.find('IRC -- maximum number of cycles reached', start, end) >= 0
+                     or text.find('IRC -- convergence criterion reached', start, end) >= 0)
+
+    return coordinates_step, step_energy, end_of_branch
+
+
+def collect_irc_steps(steps, as_arrays=False):
+    """
+    Collect the IRC steps in the parser output format
+
+    :param steps: iterable of IRC steps (from read_irc_steps)
+    :param as_arrays: also return the coordinates and energies of each branch as numpy arrays
+    :return: parsed data
+    """
+    data_dict = {}
+
+    forward_steps = []
+    backward_steps = []
+    for step in steps:
+        step_data = {'molecule': step['molecule'],
+                     'energy': step['energy']}
+        if step['branch'] == 'forward':
+            forward_steps.append(step_data)
         else:
-            backward_steps.append({'molecule': step_molecule,
-                                   'energy': step_energy,
-                                   })
+            backward_steps.append(step_data)
 
     data_dict['irc_forward'] = forward_steps
-    data_dict['irc_backward'] = forward_steps
+    data_dict['irc_backward'] = backward_steps
+
+    if as_arrays:
+        for branch, branch_steps in [('forward', forward_steps), ('backward', backward_steps)]:
+            data_dict['irc_{}_arrays'.format(branch)] = {
+                'coordinates': np.array([step['molecule'].coordinates for step in branch_steps], dtype=float),
+                'energies': np.array([step['energy'] for step in branch_steps], dtype=float)}
+
+    return data_dict
+
+
+def collect_irc_trajectories(header, steps):
+    """
+    Collect the IRC steps as a Trajectory for each branch
+
+    :param header: text containing the input molecule
+    :param steps: iterable of (text, start, end) with the position of each step in the text
+    :return: parsed data
+    """
+    charge, multiplicity, symbols, coordinates = read_input_molecule(header)
+
+    branches = {'forward': ([], []), 'backward': ([], [])}
+    for coordinates_step, step_energy, branch in read_irc_branches(steps, len(coordinates)):
+        branches[branch][0].append(coordinates_step)
+        branches[branch][1].append(step_energy)
+
+    data_dict = {}
+    for branch, (coordinates_list, energies) in branches.items():
+        data_dict['irc_' + branch] = Trajectory(coordinates=coordinates_list,
+                                                symbols=symbols,
+                                                charge=charge,
+                                                multiplicity=multiplicity,
+                                                energies=energies)
 
-    return data_dict
\ No newline at end of file
+    return data_dict
@@ -1,9 +1,11 @@
 from qcparsers.abstractions.molecule import Molecule
+from qcparsers.abstractions.trajectory import Trajectory
+from qcparsers.tools import read_input_molecule
+from qcparsers.tools.stream import iter_string_sections
 import numpy as np
-import re
 
 
-def parser_optimization(output):
+def parser_optimization(output, as_arrays=False, as_trajectory=False):
     """
     Parser for optimization
 
@@ -16,64 +18,83 @@ def parser_optimization(output):
     - Displacement
 
     :param output: the Q-Chem output
+    :param as_arrays: also return the data of all the steps as numpy arrays (optimization_arrays)
+    :param as_trajectory: return the optimization steps as a Trajectory
     :return: parsed data
     """
 
-    data_dict = {}
+    return read_optimization_sections(iter_string_sections(output, 'Optimization Cycle'),
+                                      as_arrays=as_arrays, as_trajectory=as_trajectory)
+
+
+def read_optimization_sections(sections, as_arrays=False, as_trajectory=False):
+    """
+    Parse an optimization from the output split in sections at each 'Optimization Cycle'
+
+    :param sections: iterable of (offset, text). The first section contains the input
+    :param as_arrays: also return the data of all the steps as numpy arrays (optimization_arrays)
+    :param as_trajectory: return the optimization steps as a Trajectory
+    :return: parsed data
+    """
 
-    n = output.find('$molecule')
-    n2 = output[n:].find('$end')
+    data_dict = {}
 
-    molecule_region = output[n:n+n2-1].replace('\t', ' ').split('\n')[1:]
-    charge, multiplicity = [int(num) for num in molecule_region[0].split()]
-    coordinates = np.array([np.array(line.split()[1:4], dtype=float) for line in molecule_region[1:]])
-    symbols = [line.split()[0].capitalize() for line in molecule_region[1:]]
+    sections = iter(sections)
+    header = next(sections)[1]
+    charge, multiplicity, symbols, coordinates = read_input_molecule(header)
     n_atoms = len(coordinates)
 
     step_s2 = None
+    convergence = None
     # Optimization steps
     optimization_steps = []
-    list_iterations = [l.end() for l in re.finditer('Optimization Cycle', output)]
-    for ini, fin in zip(list_iterations, list_iterations[1:] + [len(output)]):
-        step_section = output[ini:fin]
-        enum = step_section.find('Coordinates (Angstroms)')
-        atoms_list = step_section[enum:].split('\n')[2:n_atoms+2]
-        coordinates_step = np.array([atom.split()[2:] for atom in atoms_list], dtype=float).tolist()
-
-        step_molecule = Molecule(coordinates=coordinates_step,
-                                 symbols=symbols,
-                                 charge=charge,
-                                 multiplicity=multiplicity)
-
-        enum = step_section.find('Energy is')
-        step_energy = float(step_section[enum: enum+50].split()[2])
-        enum = step_section.find('      Gradient')
-        step_gradient = float(step_section[enum: enum+50].split()[1])
-        enum = step_section.find('      Displacement')
-        step_displacement = float(step_section[enum: enum+50].split()[1])
-
-        enum = step_section.find('<S^2>')
-        if enum > 0:
-            step_s2 = float(step_section[enum: enum+50].split()[2])
-
-        optimization_steps.append({'molecule': step_molecule,
-                                   'energy': step_energy,
-                                   'gradient': step_gradient,
-                                   'displacement': step_displacement})
-
-    data_dict['optimization_steps'] = optimization_steps
+    for offset, section in sections:
+        step = read_optimization_step(section[len('Optimization Cycle'):], n_atoms)
 
-    # Optimization Convergence
-    enum = output.find('**  OPTIMIZATION CONVERGED  **')
-    if enum > 0:
-        ne = output[enum-200:enum].find('Final energy')
+        if step['s2'] is not None:
+            step_s2 = step['s2']
 
-        final_energy = float(output[ne+enum-200: enum].split()[3])
-        optimization_section = output[enum:]
-        coordinates_section = optimization_section.split('\n')
-        coordinates_final = [line.split()[2:5] for line in coordinates_section[5:5+n_atoms]]
+        optimization_steps.append(step)
 
-        optimized_molecule = Molecule(coordinates=np.array(coordinates_final, dtype=float).tolist(),
+        if convergence is None:
+            convergence = read_optimization_convergence(section, n_atoms)
+
+    trajectory = None
+    if as_trajectory or as_arrays:
+        trajectory = Trajectory(coordinates=[step['coordinates'] for step in optimization_steps],
+                                symbols=symbols,
+                                charge=charge,
+                                multiplicity=multiplicity,
+                                energies=[step['energy'] for step in optimization_steps],
+                                gradients=[step['gradient'] for step in optimization_steps],
+                                displacements=[step['displacement'] for step in optimization_steps],
+                                s2=[step['s2'] for step in optimization_steps])
+
+    if as_arrays:
+        # data of all the steps (s2 is nan in the steps where it is not found)
+        data_dict['optimization_arrays'] = {'coordinates': trajectory.coordinates,
+                                            'energies': trajectory.energies,
+                                            'gradients': trajectory.gradients,
+                                            'displacements': trajectory.displacements,
+                                            's2': trajectory.s2}
+
+    if as_trajectory:
+        data_dict['optimization_steps'] = trajectory
+    else:
+        data_dict['optimization_steps'] = [{'molecule': Molecule(coordinates=step['coordinates'],
+                                                                 symbols=symbols,
+                                                                 charge=charge,
+                                                                 multiplicity=multiplicity),
+                                            'energy': step['energy'],
+                                            'gradient': step['gradient'],
+                                            'displacement': step['displacement']}
+                                           for step in optimization_steps]
+
+    # Optimization Convergence
+    if convergence is not None:
+        final_energy, coordinates_final = convergence
+
+        optimized_molecule = Molecule(coordinates=coordinates_final,
                                       symbols=symbols,
                                       charge=charge,
                                       multiplicity=multiplicity)
@@ -85,3 +106,250 @@ def parser_optimization(output):
     return data_dict
 
 
+def read_optimization_step(step_section, n_atoms):
+    """
+    Read the data of one optimization cycle
+
+    :param step_section: text of the cycle (after 'Optimization Cycle')
+    :param n_atoms: number of atoms
+    :return: dictionary with coordinates, energy, gradient, displacement and S^2 (None if not found)
+    """
+    enum = step_section.find('Coordinates (Angstroms)')
+    atoms_list = step_section[enum:].split('\n', n_atoms+2)[2:n_atoms+2]
+    coordinates_step = np.array([atom.split()[2:] for atom in atoms_list], dtype=float)
+
+    enum = step_section.find('Energy is')
+    step_energy = float(step_section[enum: enum+50].split()[2])
+    enum = step_section.find('      Gradient')
+    step_gradient = float(step_section[enum: enum+50].split()[1])
+    enum = step_section.find('      Displacement')
+    step_displacement = float(step_section[enum: enum+50].split()[1])
+
+    step_s2 = None
+    enum = step_section.find('<S^2>')
+    if enum > 0:
+        step_s2 = float(step_section[enum: enum+50].split()[2])
+
+    return {'coordinates': coordinates_step,
+            'energy': step_energy,
+            'gradient': step_gradient,
+            'displacement': step_displacement,
+            's2': step_s2}
+
+
+def read_optimization_convergence(section, n_atoms):
+    """
+    Read the final energy and coordinates of a converged optimization
+
+    :param section: text that may contain the convergence message
+    :param n_atoms: number of atoms
+    :return: final energy and coordinates (None if the convergence message is not found)
+    """
+    enum = section.find('**  OPTIMIZATION CONVERGED  **')
+    if enum <= 0:
+        return None
+
+    ne = section.find('Final energy', max(enum-200, 0), enum)
+
+    final_energy = float(section[ne: enum].split()[3])
+    coordinates_section = section[enum:].split('\n', 5+n_atoms)
+    coordinates_final = [line.split()[2:5] for line in coordinates_section[5:5+n_atoms]]
+
+    return final_energy, np.array(coordinates_final, dtype=float)
+
+
+class OptimizationFollower:
+    """
+    Follow the output file of a running optimization
+
+    At each poll only the data written since the previous poll is read and
+    only the new optimization cycles are parsed. The last cycle is parsed when the
+    optimization converges, when the job ends (normal termination or error message)
+    or when the follower is closed.
+    """
+    def __init__(self, file_name, on_cycle=None, on_converged=None, on_finished=None, encoding='utf-8'):
+        """
+        :param file_name: the Q-Chem output file name
+        :param on_cycle: function called with the data of each new optimization cycle
+        :param on_converged: function called with the final data when the optimization converges
+        :param on_finished: function called with the parsed data (see get_data) when the optimization
+                            converges, the job ends or the follower is closed
+        :param encoding: text encoding of the file
+        """
+        self._file_name = file_name
+        self._on_cycle = on_cycle
+        self._on_converged = on_converged
+        self._on_finished = on_finished
+        self._encoding = encoding
+
+        self._marker = 'Optimization Cycle'.encode(encoding)
+        self._converged_marker = '**  OPTIMIZATION CONVERGED  **'.encode(encoding)
+        self._end_markers = [marker.encode(encoding) for marker in ['Thank you very much for using Q-Chem',
+                                                                    'Q-Chem fatal error occurred']]
+
+        self._offset = 0
+        self._buffer = bytearray()
+        self._search_from = 0
+        self._molecule = None
+        self._s2 = None
+        self._finished = False
+
+        self.cycles = []
+        self.convergence = None
+
+    @property
+    def offset(self):
+        """
+        returns the number of bytes of the file read
+
+        :return: the offset
+        """
+        return self._offset
+
+    @property
+    def converged(self):
+        """
+        returns True if the optimization has converged
+
+        :return: convergence
+        """
+        return self.convergence is not None
+
+    @property
+    def finished(self):
+        """
+        returns True if the optimization has converged, the job has ended or the follower is closed
+
+        :return: finished
+        """
+        return self._finished
+
+    def poll(self):
+        """
+        read the new data of the file and parse the completed optimization cycles
+
+        :return: list of the new cycles
+        """
+        if self.finished:
+            return []
+
+        with open(self._file_name, 'rb') as f:
+            f.seek(self._offset)
+            new_data = f.read()
+
+        self._offset += len(new_data)
+        self._buffer.extend(new_data)
+
+        new_cycles = []
+        while not self.finished:
+            # the buffer always starts at a section (header or cycle)
+            enum = self._buffer.find(self._marker, self._search_from)
+            if enum < 0:
+                self._search_from = max(len(self._buffer) - len(self._marker) + 1, 1)
+                if self._molecule is not None and self._read_convergence():
+                    new_cycles.append(self.cycles[-1])
+                elif any(self._buffer.find(marker) >= 0 for marker in self._end_markers):
+                    new_cycles += self._finish()
+                break
+
+            section = self._buffer[:enum].decode(self._encoding)
+            del self._buffer[:enum]
+            self._search_from = len(self._marker)
+
+            if self._molecule is None:
+                self._molecule = read_input_molecule(section)
+            else:
+                new_cycles.append(self._add_cycle(section))
+
+        return new_cycles
+
+    def close(self):
+        """
+        read the remaining data of the file and stop following it. The last cycle
+        of a job that ended without a final message (e.g. killed) is parsed if it is complete
+
+        :return: list of the new cycles
+        """
+        new_cycles = self.poll()
+        if not self.finished:
+            new_cycles += self._finish()
+
+        return new_cycles
+
+    def get_data(self):
+        """
+        get the data parsed so far in the format of parser_optimization
+
+        :return: parsed data
+        """
+        data_dict = {'optimization_steps': [{key: cycle[key] for key in ['molecule', 'energy',
+                                                                         'gradient', 'displacement']}
+                                            for cycle in self.cycles]}
+        if self.converged:
+            data_dict.update(self.convergence)
+
+        return data_dict
+
+    def _build_molecule(self, coordinates):
+        charge, multiplicity, symbols, _ = self._molecule
+        return Molecule(coordinates=coordinates,
+                        symbols=symbols,
+                        charge=charge,
+                        multiplicity=multiplicity)
+
+    def _add_cycle(self, section):
+        step = read_optimization_step(section[len('Optimization Cycle'):], len(self._molecule[3]))
+        if step['s2'] is not None:
+            self._s2 = step['s2']
+
+        cycle = {'cycle': len(self.cycles) + 1,
+                 'molecule': self._build_molecule(step['coordinates']),
+                 'energy': step['energy'],
+                 'gradient': step['gradient'],
+                 'displacement': step['displacement'],
+                 's2': step['s2']}
+
+        self.cycles.append(cycle)
+        if self._on_cycle is not None:
+            self._on_cycle(cycle)
+
+        return cycle
+
+    def _read_convergence(self):
+        # the last cycle is complete once the final coordinates are written
+        n_atoms = len(self._molecule[3])
+        enum = self._buffer.find(self._converged_marker, len(self._marker))
+        if enum < 0 or self._buffer.count(b'\n', enum) < 5 + n_atoms:
+            return False
+
+        section = self._buffer.decode(self._encoding)
+        del self._buffer[:]
+        self._add_cycle(section)
+
+        final_energy, coordinates_final = read_optimization_convergence(section, n_atoms)
+        self.convergence = {'optimized_molecule': self._build_molecule(coordinates_final),
+                            'energy': final_energy,
+                            's2': self._s2}
+
+        if self._on_converged is not None:
+            self._on_converged(self.convergence)
+
+        self._finish()
+
+        return True
+
+    def _finish(self):
+        # parse the last cycle if it is complete (the convergence table is written)
+        new_cycles = []
+        if self._molecule is not None and len(self._buffer) > 0:
+            section = self._buffer.decode(self._encoding)
+            del self._buffer[:]
+            enum = section.find('      Displacement')
+            if enum >= 0 and section.find('\n', enum) >= 0:
+                new_cycles.append(self._add_cycle(section))
+
+        self._finished = True
+        if self._on_finished is not None:
+            self._on_finished(self.get_data())
+
+        return new_cycles
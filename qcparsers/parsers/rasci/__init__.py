@@ -1,11 +1,13 @@
 from qcparsers.abstractions.molecule import Molecule
-from qcparsers.tools import read_basic_info, search_bars, standardize_vector
+from qcparsers.tools import read_basic_info, search_bars, standardize_vector, format_array
+from qcparsers.tools.index import OutputIndex
+from qcparsers.tools.elements import normalize_symbols
 from qcparsers.parsers.rasci.support import *
-import operator
+import numpy as np
 import re
 
 
-def parser_rasci(output):
+def parser_rasci(output, as_arrays=False, index=None):
     """
     Parser for RAS-CI calculations
     Include:
@@ -14,19 +16,23 @@ def parser_rasci(output):
     - Adiabatic states
     - SOC
 
-    :param output: parsed data
-    :return:
+    :param output: the Q-Chem output
+    :param as_arrays: return numerical data as numpy arrays instead of lists
+    :param index: OutputIndex of the output (shared between parsers)
+    :return: parsed data
     """
+    if index is None:
+        index = OutputIndex(output)
 
     data_dict = {}
     # Molecule
-    n = output.find('$molecule')
-    n2 = output[n:].find('$end')
+    n = index.find('$molecule')
+    n2 = index.find('$end', n) - n
 
     molecule_region = output[n:n+n2-1].replace('\t', ' ').split('\n')[1:]
     charge, multiplicity = [int(num) for num in molecule_region[0].split()]
     coordinates = [[float(l) for l in line.split()[1:4]] for line in molecule_region[1:]]
-    symbols = [line.split()[0].capitalize() for line in molecule_region[1:]]
+    symbols = normalize_symbols([line.split()[0] for line in molecule_region[1:]])
     n_atoms = len(symbols)
 
     # structure
@@ -35,7 +41,7 @@ def parser_rasci(output):
                                charge=charge,
                                multiplicity=multiplicity)
 
-    enum = output.find('Standard Nuclear Orientation')
+    enum = index.find('Standard Nuclear Orientation')
     section_structure = output[enum:enum + 200*structure_input.get_number_of_atoms()].split('\n')
     section_structure = section_structure[3:structure_input.get_number_of_atoms()+3]
     coordinates = [[float(num) for num in s.split()[2:]] for s in section_structure]
@@ -46,11 +52,10 @@ def parser_rasci(output):
                                       multiplicity=multiplicity)
 
     # basic info
-    enum = output.find('Molecular Point Group')
-    basic_data = read_basic_info(output[enum:enum + 5000])
+    basic_data = read_basic_info(output, index=index)
 
     # scf_energy
-    enum = output.find('SCF   energy in the final basis set')
+    enum = index.find('SCF   energy in the final basis set')
     scf_energy = float(output[enum:enum+100].split()[8])
 
     data_dict['scf_energy'] = scf_energy
@@ -59,8 +64,8 @@ def parser_rasci(output):
     # total_energy = float(output[enum:enum+100].split()[8])
 
     # RASCI dimensions
-    ini_section = output.find('RAS-CI Dimensions')
-    end_section = search_bars(output, from_position=enum, bar_type='\*\*\*')[1]
+    ini_section = index.find('RAS-CI Dimensions')
+    end_section = search_bars(output, from_position=enum, bar_type=r'\*\*\*', n_bars=2)[1]
     dimension_section = output[ini_section: end_section]
 
     enum = dimension_section.find('Doubly Occ')
@@ -93,11 +98,14 @@ def parser_rasci(output):
     data_dict.update({'rasci_dimensions': rasci_dimensions})
 
     # Diabatization scheme
-    done_diabat = bool(output.find('RASCI DIABATIZATION')+1)
+    done_diabat = bool(index.find('RASCI DIABATIZATION')+1)
     if done_diabat:
-        rot_matrix = read_simple_matrix('showmatrix final adiabatic -> diabatic', output)[-1]
-        adiabatic_matrix = read_simple_matrix('showing H in adiabatic representation: NO coupling elements', output)[-1]
-        diabatic_matrix = read_simple_matrix('showing H in diabatic representation: WITH coupling elements', output)[-1]
+        rot_matrix = format_array(read_simple_matrix('showmatrix final adiabatic -> diabatic', output)[-1],
+                                  as_arrays)
+        adiabatic_matrix = format_array(read_simple_matrix('showing H in adiabatic representation: NO coupling elements',
+                                                           output)[-1], as_arrays)
+        diabatic_matrix = format_array(read_simple_matrix('showing H in diabatic representation: WITH coupling elements',
+                                                          output)[-1], as_arrays)
 
         mulliken_adiabatic = []
         enum = output.find('Mulliken analysis of Adiabatic State')
@@ -106,9 +114,9 @@ def parser_rasci(output):
             section_mulliken = section_mulliken[:section_mulliken.find('Natural Orbitals stored in FCHK')]
             section_attachment = section_mulliken.split('\n')[9+n_atoms:9+n_atoms*2]
 
-            mulliken_adiabatic.append({'attach': [float(l.split()[1]) for l in section_attachment],
-                                       'detach': [float(l.split()[2]) for l in section_attachment],
-                                       'total': [float(l.split()[3]) for l in section_attachment]})
+            mulliken_adiabatic.append({'attach': format_array([float(l.split()[1]) for l in section_attachment], as_arrays),
+                                       'detach': format_array([float(l.split()[2]) for l in section_attachment], as_arrays),
+                                       'total': format_array([float(l.split()[3]) for l in section_attachment], as_arrays)})
 
         mulliken_diabatic = []
         enum = output.find('showing H in diabatic representation')
@@ -117,9 +125,9 @@ def parser_rasci(output):
             section_mulliken = section_mulliken[:section_mulliken.find('Natural Orbitals stored in FCHK')]
             section_attachment = section_mulliken.split('\n')[9+n_atoms:9+n_atoms*2]
 
-            mulliken_diabatic.append({'attach': [float(l.split()[1]) for l in section_attachment],
-                                      'detach': [float(l.split()[2]) for l in section_attachment],
-                                      'total': [float(l.split()[3]) for l in section_attachment]})
+            mulliken_diabatic.append({'attach': format_array([float(l.split()[1]) for l in section_attachment], as_arrays),
+                                      'detach': format_array([float(l.split()[2]) for l in section_attachment], as_arrays),
+                                      'total': format_array([float(l.split()[3]) for l in section_attachment], as_arrays)})
 
         enum = output.find('Transition dipole moment - diabatic states')
 
@@ -127,7 +135,8 @@ def parser_rasci(output):
 
         diabatic_tdm = []
         for m in re.finditer('TDM', tdm_section):
-            diabatic_tdm.append([float(n) for n in tdm_section[m.end(): m.end()+70][14:].split()[:3]])
+            diabatic_tdm.append(format_array([float(n) for n in tdm_section[m.end(): m.end()+70][14:].split()[:3]],
+                                             as_arrays))
 
         diabatic_states = []
         for i, tdm in enumerate(diabatic_tdm):
@@ -144,11 +153,11 @@ def parser_rasci(output):
                                       'mulliken_adiabatic': mulliken_adiabatic}
 
     # excited states data
+    structure = data_dict['structure']
     excited_states = []
-    for m in re.finditer('RAS-CI total energy for state', output):
-        # print('ll found', m.start(), m.end())
-
-        section_state = output[m.end():m.end() + 10000]  # 10000: assumed to max of section
+    for enum_state in index.find_all('RAS-CI total energy for state'):
+        enum_state += len('RAS-CI total energy for state')
+        section_state = output[enum_state:enum_state + 10000]  # 10000: assumed to max of section
         section_state = section_state[:section_state.find('********')]
 
         enum = section_state.find('RAS-CI total energy for state')
@@ -172,7 +181,7 @@ def parser_rasci(output):
             trans_mom = [float(section_state[enum:].split()[2]) + 0.0,
                          float(section_state[enum:].split()[4]) + 0.0,
                          float(section_state[enum:].split()[6]) + 0.0]
-            trans_mom = standardize_vector(trans_mom)
+            trans_mom = format_array(standardize_vector(trans_mom), as_arrays)
             strength = float(section_state[enum:].split()[10])
         else:
             trans_mom = None
@@ -184,18 +193,22 @@ def parser_rasci(output):
         section_table = section_state[enum: enum2].split('\n')[2:-2]
 
         # ' HOLE  | ALPHA | BETA  | PART | AMPLITUDE'
+        configurations = read_rasci_configurations(section_table)
+        configurations = configurations[np.argsort(configurations, order=['hole', 'alpha', 'beta', 'part'],
+                                                   kind='stable')]
+        occupations = get_rasci_occupations_arrays(configurations,
+                                                   structure.number_of_electrons + structure.charge,
+                                                   basic_data['n_basis_functions'])
+
         table = []
-        for row in section_table:
-            table.append({'hole': row.split('|')[1].strip(),
-                          'alpha': row.split('|')[2].strip(),
-                          'beta': row.split('|')[3].strip(),
-                          'part': row.split('|')[4].strip(),
-                          'amplitude': float(row.split('|')[5]) + 0.0})
-            table[-1]['occupations'] = get_rasci_occupations_list(table[-1],
-                                                                  data_dict['structure'],
-                                                                  basic_data['n_basis_functions'])
-
-        table = sorted(table, key=operator.itemgetter('hole', 'alpha', 'beta', 'part'))
+        for i, (hole, alpha, beta, part, amplitude) in enumerate(configurations.tolist()):
+            table.append({'hole': hole,
+                          'alpha': alpha,
+                          'beta': beta,
+                          'part': part,
+                          'amplitude': amplitude,
+                          'occupations': {spin: occupation[i] if as_arrays else occupation[i].tolist()
+                                          for spin, occupation in occupations.items()}})
 
         # Contributions RASCI wfn
         contributions_section = section_state[enum2:]
@@ -210,23 +223,28 @@ def parser_rasci(output):
                                'excitation_energy': exc_energy,
                                'excitation_energy_units': exc_energy_units,
                                'multiplicity': state_multiplicity,
-                               'dipole_moment': dipole_mom,
+                               'dipole_moment': format_array(dipole_mom, as_arrays),
                                'transition_moment': trans_mom,
                                'dipole_moment_units': 'ua',
                                'oscillator_strength': strength,
                                'configurations': table,
                                'contributions_fwn': contributions})
 
+        if as_arrays:
+            excited_states[-1]['configurations_array'] = configurations
+            excited_states[-1]['occupations_array'] = occupations
+
     data_dict.update({'excited_states': excited_states})
 
     # Interstate transition properties
-    done_interstate = bool(output.find('Interstate Transition Properties')+1)
+    done_interstate = bool(index.find('Interstate Transition Properties')+1)
     if done_interstate:
-        ini_section = output.find('Interstate Transition Properties')
-        end_section = search_bars(output, from_position=ini_section)[1]
+        ini_section = index.find('Interstate Transition Properties')
+        end_section = search_bars(output, from_position=ini_section, n_bars=2)[1]
         interstate_section = output[ini_section: end_section]
 
         interstate_dict = {}
+        spins = {}
         for m in re.finditer('State A: Root', interstate_section):
             section_pair = interstate_section[m.start():m.start() + 10000]
             section_pair = section_pair[:section_pair.find('********')]
@@ -250,8 +268,10 @@ def parser_rasci(output):
                 if "KET: S',Sz'" in line:
                     s_a = float(lines[i].split('=')[1].split()[0])
                     s_b = float(lines[i+1].split('=')[1].split()[0])
+                    spins.update({state_a: s_a, state_b: s_b})
                 if '1-elec SOC matrix (cm-1)' in line:
-                    pair_dict['1e_soc_mat'] = read_soc_matrix(lines[i + 1:], [int(2 * s_b + 1), int(2 * s_a + 1)])
+                    soc_matrix = read_soc_matrix(lines[i + 1:], [int(2 * s_b + 1), int(2 * s_a + 1)])
+                    pair_dict['1e_soc_mat'] = format_array(soc_matrix, as_arrays)
                 if '2e-SOMF Reduced matrix elements (cm-1)' in line:
                     r, c = lines[i+1].split()[-2:]
                     pair_dict['hso_l-'] = float(r) + float(c) * 1j
@@ -261,14 +281,25 @@ def parser_rasci(output):
                     pair_dict['hso_l+'] = float(r) + float(c) * 1j
 
                 if '2-elec mean-field SOC matrix (cm-1)' in line:
-                    pair_dict['2e_soc_mat'] = read_soc_matrix(lines[i + 1:], [int(2 * s_b + 1), int(2 * s_a + 1)])
+                    soc_matrix = read_soc_matrix(lines[i + 1:], [int(2 * s_b + 1), int(2 * s_a + 1)])
+                    pair_dict['2e_soc_mat'] = format_array(soc_matrix, as_arrays)
                 if 'Total mean-field SOC matrix (cm-1)' in line:
-                    pair_dict['total_soc_mat'] = read_soc_matrix(lines[i + 1:], [int(2 * s_b + 1), int(2 * s_a + 1)])
+                    soc_matrix = read_soc_matrix(lines[i + 1:], [int(2 * s_b + 1), int(2 * s_a + 1)])
+                    pair_dict['total_soc_mat'] = format_array(soc_matrix, as_arrays)
                 if 'Mean-Field SOCC' in line:
                     pair_dict['mf_socc'] = float(line.split()[-2])
                     pair_dict['units'] = line.split()[-1]
 
             interstate_dict[(state_a, state_b)] = pair_dict
+            for state in [state_a, state_b]:
+                spins.setdefault(state, 0)
+
         data_dict.update({'interstate_properties': interstate_dict})
+        if as_arrays:
+            interstate_arrays, pair_blocks = get_interstate_arrays(interstate_dict, spins)
+            # SOC matrices of each pair as views of the blocks of the dense arrays
+            data_dict['interstate_properties'] = {pair: dict(pair_dict, **pair_blocks[pair])
+                                                  for pair, pair_dict in interstate_dict.items()}
+            data_dict['interstate_properties_arrays'] = interstate_arrays
 
     return data_dict
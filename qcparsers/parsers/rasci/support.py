@@ -1,3 +1,4 @@
+from qcparsers.tools import read_block_matrix
 import numpy as np
 import re
 
@@ -34,33 +35,143 @@ def get_rasci_occupations_list(configuration, structure, total_orbitals):
 
     return {'alpha': vector_alpha, 'beta': vector_beta}
 
+
+def read_rasci_configurations(section_table):
+    """
+    Read the table of configurations of a RAS-CI state (' | HOLE | ALPHA | BETA | PART | AMPLITUDE')
+
+    :param section_table: list of the lines of the table
+    :return: numpy structured array with fields hole, alpha, beta, part (str) and amplitude (float)
+    """
+    rows = [[field.strip() for field in row.split('|')[1:6]] for row in section_table]
+
+    width = max([len(field) for row in rows for field in row[:4]] + [1])
+    dtype = [('hole', 'U{}'.format(width)),
+             ('alpha', 'U{}'.format(width)),
+             ('beta', 'U{}'.format(width)),
+             ('part', 'U{}'.format(width)),
+             ('amplitude', float)]
+
+    return np.array([(hole, alpha, beta, part, float(amplitude) + 0.0) for hole, alpha, beta, part, amplitude in rows],
+                    dtype=dtype)
+
+
+def get_rasci_occupations_arrays(configurations, n_electrons, total_orbitals):
+    """
+    Compute the occupations of all the configurations of a RAS-CI state at once
+    (same occupations as get_rasci_occupations_list)
+
+    :param configurations: structured array of configurations (from read_rasci_configurations)
+    :param n_electrons: number of electrons plus charge of the molecule (as in get_occupied_electrons)
+    :param total_orbitals: total number of orbitals
+    :return: dictionary with the alpha and beta occupations as uint8 arrays [n_configurations, n_orbitals]
+    """
+    n_conf = len(configurations)
+
+    def digits(strings):
+        lengths = np.array([len(string) for string in strings], dtype=int)
+        values = np.frombuffer(''.join(strings).encode(), dtype=np.uint8) - ord('0')
+        rows = np.repeat(np.arange(n_conf), lengths)
+        n_electrons_spin = np.bincount(rows, weights=values, minlength=n_conf).astype(int)
+        return values, lengths, rows, n_electrons_spin
+
+    alpha_digits, alpha_lengths, alpha_rows, alpha_e = digits(configurations['alpha'])
+    beta_digits, beta_lengths, beta_rows, beta_e = digits(configurations['beta'])
+
+    has_hole = configurations['hole'] != ''
+    has_part = configurations['part'] != ''
+
+    occupied = (n_electrons - (alpha_e + beta_e + has_part - has_hole)) // 2
+
+    n_orbitals = max([total_orbitals] + (occupied + np.maximum(alpha_lengths, beta_lengths)).tolist())
+    orbitals = np.arange(n_orbitals)
+
+    occupations = {}
+    for spin, values, lengths, rows in [('alpha', alpha_digits, alpha_lengths, alpha_rows),
+                                        ('beta', beta_digits, beta_lengths, beta_rows)]:
+        matrix = (orbitals[None, :] < occupied[:, None]).astype(np.uint8)
+        columns = np.repeat(occupied, lengths) + np.arange(len(values)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        matrix[rows, columns] = values
+        occupations[spin] = matrix
+
+    rows = np.arange(n_conf)
+    if np.any(has_hole):
+        hole = np.where(has_hole, configurations['hole'], '1').astype(int) - 1
+        to_alpha = has_hole & (alpha_e > beta_e)
+        to_beta = has_hole & ~(alpha_e > beta_e)
+        occupations['alpha'][rows[to_alpha], hole[to_alpha]] = 0
+        occupations['beta'][rows[to_beta], hole[to_beta]] = 0
+
+    if np.any(has_part):
+        part = np.where(has_part, configurations['part'], '1').astype(int) - 1
+        alpha_sum = occupations['alpha'].sum(axis=1, dtype=int)
+        beta_sum = occupations['beta'].sum(axis=1, dtype=int)
+        to_alpha = has_part & (alpha_sum < beta_sum)
+        to_beta = has_part & ~(alpha_sum < beta_sum)
+        occupations['alpha'][rows[to_alpha], part[to_alpha]] = 1
+        occupations['beta'][rows[to_beta], part[to_beta]] = 1
+
+    return occupations
+
+
 def read_simple_matrix(header, output, maxchar=10000, foot='-------'):
     matrix_list = []
     for m in re.finditer(header, output):
         section_state = output[m.end():m.end() + maxchar]  # 10000: assumed to max of section
         section_state = section_state[:section_state.find(foot)]
-        dim = len(section_state.split('\n')[1].split())
-        matrix = section_state.split('\n')[1:dim + 1]
-        matrix = [[float(n) for n in l.split()] for l in matrix]
+        matrix = read_block_matrix(section_state.split('\n')[1:], header=False, label_width=0)
         matrix_list.append(matrix)
 
     return matrix_list
 
 
 def read_soc_matrix(lines, dimensions):
-    # for line in lines:
-    #     print(line)
-
-    col_per_line = 5
-    matrix = []
-    for ib in range(dimensions[0]):
-        real = []
-        complex = []
-        for j in range((dimensions[1] - 1) // col_per_line + 1):
-            real += lines[j*dimensions[0] + 1 * (j+1) + ib][11:].split()[0::2]
-            complex += lines[j*dimensions[0] + 1 * (j+1) +ib][11:].split()[1::2]
-
-        row = [float(r) + float(c[:-1]) * 1j for r, c in zip(real, complex)]
-        matrix.append(row)
-
-    return matrix
+    return read_block_matrix(lines, dimensions[0], dimensions[1], label_width=11, complex_values=True)
+
+
+def get_interstate_arrays(interstate_dict, spins):
+    """
+    Build the dense arrays of the interstate properties of all the pairs of states
+
+    The SOC matrices of the pairs are placed in blocks of the SOC Hamiltonian over all the
+    spin sublevels of the states (the blocks of the pairs not in the output are set to zero).
+    The sublevels of each state are labeled by ms, in the order of the output (from -S to S).
+
+    :param interstate_dict: dictionary of the interstate properties of each pair of states (state_a, state_b)
+    :param spins: dictionary with the spin (S) of each state
+    :return: dictionary of arrays and dictionary {(state_a, state_b): SOC matrices} of views of their blocks
+    """
+    states = sorted(spins)
+    position = {state: i for i, state in enumerate(states)}
+    dimensions = [int(2 * spins[state] + 1) for state in states]
+    offsets = np.concatenate([[0], np.cumsum(dimensions)]).astype(int)
+    sublevels = [(state, -spins[state] + i) for state, dimension in zip(states, dimensions) for i in range(dimension)]
+
+    def block(matrix, state_row, state_column):
+        ini_row, ini_column = offsets[position[state_row]], offsets[position[state_column]]
+        return matrix[ini_row: ini_row + dimensions[position[state_row]],
+                      ini_column: ini_column + dimensions[position[state_column]]]
+
+    interstate_arrays = {'states': np.array(states, dtype=int),
+                         'sublevels': sublevels}
+    pair_blocks = {pair: {} for pair in interstate_dict}
+
+    for key in ['1e_soc_mat', '2e_soc_mat', 'total_soc_mat']:
+        soc_matrix = np.zeros((offsets[-1], offsets[-1]), dtype=complex)
+        for (state_a, state_b), pair_dict in interstate_dict.items():
+            if key in pair_dict:
+                # rows: sublevels of state B, columns: sublevels of state A
+                block(soc_matrix, state_a, state_b)[:] = np.conj(pair_dict[key]).T
+                block(soc_matrix, state_b, state_a)[:] = pair_dict[key]
+                pair_blocks[(state_a, state_b)][key] = block(soc_matrix, state_b, state_a)
+        interstate_arrays[key] = soc_matrix
+
+    for key in ['gamma_total', 'mf_socc']:
+        matrix = np.zeros((len(states), len(states)))
+        for (state_a, state_b), pair_dict in interstate_dict.items():
+            if key in pair_dict:
+                matrix[position[state_a], position[state_b]] = pair_dict[key]
+                matrix[position[state_b], position[state_a]] = pair_dict[key]
+        interstate_arrays[key] = matrix
+
+    return interstate_arrays, pair_blocks
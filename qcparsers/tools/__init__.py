@@ -2,16 +2,31 @@
 # This file contains general parsing tools that can be used for different parsers
 # You can add new functions that you think it may be usefull for others
 #
+from qcparsers.tools.elements import normalize_symbols
+from collections.abc import Mapping
+import numpy as np
 import re
 
 
-def read_basic_info(output):
-    enum = output.find('Molecular Point Group')
+def read_basic_info(output, index=None):
+    """
+    Read the point group, number of electrons, shells and basis functions
+
+    :param output: the Q-Chem output
+    :param index: OutputIndex of the output
+    :return: dictionary with the basic data
+    """
+    from qcparsers.tools.index import OutputIndex
+
+    if index is None:
+        index = OutputIndex(output, markers=['Molecular Point Group', 'Largest Abelian Subgroup', 'There are '])
+
+    enum = index.find('Molecular Point Group')
     mpg = output[enum:enum+100].split()[3]
-    enum = output.find('Largest Abelian Subgroup')
-    las = output[enum:enum+100].split()[3]
+    enum2 = index.find('Largest Abelian Subgroup', enum)
+    las = output[enum2:enum2+100].split()[3]
 
-    there_vector = [m.start() for m in re.finditer('There are ', output)]
+    there_vector = index.find_all('There are ', enum)
     n_alpha = int(output[there_vector[0]:there_vector[0]+100].split()[2])
     n_beta = int(output[there_vector[0]:there_vector[0]+100].split()[5])
 
@@ -26,6 +41,24 @@ def read_basic_info(output):
             'n_basis_functions': nbas}
 
 
+def read_input_molecule(output):
+    """
+    Read the molecule defined in the $molecule section of the input
+
+    :param output: the Q-Chem output
+    :return: charge, multiplicity, symbols and coordinates
+    """
+    n = output.find('$molecule')
+    n2 = output.find('$end', n) - n
+
+    molecule_region = output[n:n+n2-1].replace('\t', ' ').split('\n')[1:]
+    charge, multiplicity = [int(num) for num in molecule_region[0].split()]
+    coordinates = np.array([np.array(line.split()[1:4], dtype=float) for line in molecule_region[1:]])
+    symbols = normalize_symbols([line.split()[0] for line in molecule_region[1:]])
+
+    return charge, multiplicity, symbols, coordinates
+
+
 def get_cis_occupations_list(number_of_orbitals,
                              alpha_electrons,
                              beta_electrons,
@@ -73,16 +106,118 @@ def standardize_vector(vector):
     return vector
 
 
-def search_bars(output, from_position=0, bar_type='---'):
-    output = output[from_position:]
+def search_bars(output, from_position=0, bar_type='---', n_bars=None):
     positions = []
-    previous = 0
-    for m in re.finditer(bar_type, output):
+    previous = from_position
+    for m in re.compile(bar_type).finditer(output, from_position):
         if m.start() > previous + 1:
-            positions.append(m.start() + from_position)
+            positions.append(m.start())
+            if n_bars is not None and len(positions) == n_bars:
+                break
         previous = m.end()
 
     return positions
 
 
-
+def read_block_matrix(lines, n_rows=None, n_columns=None, header=True, label_width=None, complex_values=False):
+    """
+    Read a matrix printed in blocks of columns (the width of the blocks is detected from the number of values)
+
+    :param lines: lines of the matrix (starting at the header of the first block)
+    :param n_rows: number of rows (if None it is the number of values of the first row)
+    :param n_columns: number of columns (if None it is equal to the number of rows)
+    :param header: each block starts with a header line (column labels)
+    :param label_width: number of characters of the row labels (if None the first field of each row is the label)
+    :param complex_values: the values are complex numbers written as real and imaginary parts
+                           ('a bi', 'a + bi' or 'a - bi', where b may be negative)
+    :return: numpy array [n_rows, n_columns]
+    """
+    def row_values(row):
+        if label_width is None:
+            fields = row.split(None, 1)
+            return fields[1] if len(fields) > 1 else ''
+        return row[label_width:]
+
+    if n_rows is None:
+        n_rows = len(row_values(lines[int(header)]).split())
+    if n_columns is None:
+        n_columns = n_rows
+
+    blocks = []
+    read_columns = 0
+    ini = 0
+    while read_columns < n_columns:
+        ini += int(header)
+        text = ' '.join([row_values(row) for row in lines[ini: ini + n_rows]])
+        ini += n_rows
+
+        if complex_values:
+            # join the sign of the imaginary part ('a + bi' -> 'a +b', 'a - -bi' -> 'a +b')
+            # and remove the imaginary unit
+            text = re.sub(r'(?<=[\d.])\s*([+-])\s*([+-]?)\s*(?=[\d.])',
+                          lambda m: ' -' if (m.group(1) == '-') != (m.group(2) == '-') else ' +',
+                          text)
+            text = re.sub(r'[ij(),]', ' ', text)
+            values = np.array(text.split(), dtype=float).reshape(n_rows, -1, 2)
+            values = values[:, :, 0] + 1j * values[:, :, 1]
+        else:
+            values = np.array(text.split(), dtype=float).reshape(n_rows, -1)
+
+        if values.shape[1] == 0:
+            raise ValueError('matrix block without values')
+
+        blocks.append(values)
+        read_columns += values.shape[1]
+
+    return np.hstack(blocks)
+
+
+def format_array(array, as_arrays=False, dtype=None):
+    """
+    Format numerical data for the parser output
+
+    :param array: array like data
+    :param as_arrays: if True return a contiguous numpy array, otherwise nested lists
+    :param dtype: data type of the array
+    :return: numpy array or list
+    """
+    if not as_arrays and dtype is None and isinstance(array, list):
+        # plain python data (checked on the first element of each level) is returned unchanged
+        element = array
+        while isinstance(element, list) and len(element) > 0:
+            element = element[0]
+        if isinstance(element, list) or type(element) in (int, float, complex):
+            return array
+
+    array = np.ascontiguousarray(array, dtype=dtype)
+    if as_arrays:
+        return array
+    return array.tolist()
+
+
+class LazyDict(Mapping):
+    """
+    Read-only dictionary whose values are computed on first access and then cached
+    """
+    def __init__(self, loaders, values=None):
+        """
+        :param loaders: dictionary of functions (without arguments) that return the values
+        :param values: dictionary of values already computed
+        """
+        self._cache = dict(values) if values is not None else {}
+        self._loaders = loaders
+        self._keys = list(self._cache) + [key for key in loaders if key not in self._cache]
+
+    def __getitem__(self, key):
+        if key not in self._cache:
+            self._cache[key] = self._loaders[key]()
+        return self._cache[key]
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __repr__(self):
+        return 'LazyDict({})'.format(self._keys)
@@ -0,0 +1,109 @@
+#
+# Index of the positions of the section markers in a Q-Chem output.
+# The output is scanned once and the index can be shared by several parsers
+#
+from bisect import bisect_left
+import re
+
+
+# markers must not contain each other (only the longest would be found)
+default_markers = ['$molecule',
+                   '$end',
+                   'Standard Nuclear Orientation',
+                   'Molecular Point Group',
+                   'Largest Abelian Subgroup',
+                   'There are ',
+                   'Total energy in the final basis set',
+                   'SCF   energy in the final basis set',
+                   'Orbital Energies (a.u.)',
+                   'Ground-State Mulliken Net Atomic Charges',
+                   'Cartesian Multipole Moments',
+                   'CIS Excitation Energies',
+                   'TDDFT/TDA Excitation Energies',
+                   '*********SPIN-ORBIT COUPLING JOB BEGINS HERE*********',
+                   '*********SOC CODE ENDS HERE*********',
+                   'Localization Code for CIS excited states',
+                   'Mulliken & Loewdin analysis of',
+                   'Hessian of the SCF Energy',
+                   'VIBRATIONAL ANALYSIS',
+                   'Optimization Cycle',
+                   '**  OPTIMIZATION CONVERGED  **',
+                   'Reaction path following',
+                   'RAS-CI Dimensions',
+                   'RASCI DIABATIZATION',
+                   'RAS-CI total energy for state',
+                   'Interstate Transition Properties']
+
+
+class OutputIndex:
+    """
+    Positions of the section markers of a Q-Chem output found in a single scan
+    """
+    def __init__(self, output, markers=None):
+        """
+        :param output: the Q-Chem output
+        :param markers: list of markers to index (default_markers if None)
+        """
+        if markers is None:
+            markers = default_markers
+
+        self._output = output
+        self._positions = {marker: [] for marker in markers}
+
+        pattern = '|'.join([re.escape(marker) for marker in sorted(markers, key=len, reverse=True)])
+        for m in re.finditer(pattern, output):
+            self._positions[m.group()].append(m.start())
+
+    def __contains__(self, marker):
+        return marker in self._positions
+
+    def find(self, marker, start=0, end=None):
+        """
+        position of the first occurrence of a marker (same as str.find)
+
+        :param marker: the marker
+        :param start: start position of the search
+        :param end: end position of the search
+        :return: the position (-1 if not found)
+        """
+        if marker not in self._positions:
+            return self._output.find(marker, start, len(self._output) if end is None else end)
+
+        positions = self.find_all(marker, start, end)
+        return positions[0] if len(positions) > 0 else -1
+
+    def rfind(self, marker, start=0, end=None):
+        """
+        position of the last occurrence of a marker (same as str.rfind)
+
+        :param marker: the marker
+        :param start: start position of the search
+        :param end: end position of the search
+        :return: the position (-1 if not found)
+        """
+        if marker not in self._positions:
+            return self._output.rfind(marker, start, len(self._output) if end is None else end)
+
+        positions = self.find_all(marker, start, end)
+        return positions[-1] if len(positions) > 0 else -1
+
+    def find_all(self, marker, start=0, end=None):
+        """
+        positions of all the occurrences of a marker
+
+        :param marker: the marker
+        :param start: start position of the search
+        :param end: end position of the search
+        :return: list of positions
+        """
+        if end is None:
+            end = len(self._output)
+
+        if marker not in self._positions:
+            return [m.start() for m in re.compile(re.escape(marker)).finditer(self._output, start, end)]
+
+        positions = self._positions[marker]
+        # markers must fit completely in the [start, end] range
+        ini = bisect_left(positions, start)
+        fin = bisect_left(positions, end - len(marker) + 1)
+        return positions[ini:fin]
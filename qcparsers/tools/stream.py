@@ -0,0 +1,80 @@
+#
+# Tools to read Q-Chem outputs sequentially by sections without
+# loading the whole file in memory
+#
+
+
+def iter_stream_sections(stream, marker, offset=0, encoding='utf-8'):
+    """
+    Split a binary stream in sections delimited by a marker
+
+    The first section contains the text before the first marker (it may be empty) and
+    every following section starts at a marker. Only one section is kept in memory.
+
+    :param stream: binary file object
+    :param marker: string that delimits the sections
+    :param offset: byte offset of the current position of the stream
+    :param encoding: text encoding of the file
+    :return: generator of (byte offset, section text)
+    """
+    marker = marker.encode(encoding)
+
+    lines = []
+    section_offset = offset
+    for line in stream:
+        position = line.find(marker)
+        if position >= 0:
+            lines.append(line[:position])
+            yield section_offset, b''.join(lines).decode(encoding)
+            section_offset = offset + position
+            lines = [line[position:]]
+        else:
+            lines.append(line)
+        offset += len(line)
+
+    yield section_offset, b''.join(lines).decode(encoding)
+
+
+def iter_file_sections(file_name, marker, chunk_size=1024*1024, encoding='utf-8'):
+    """
+    Read a file in chunks and split it in sections delimited by a marker
+
+    :param file_name: the file name
+    :param marker: string that delimits the sections
+    :param chunk_size: size in bytes of the chunks read from the file
+    :param encoding: text encoding of the file
+    :return: generator of (byte offset, section text)
+    """
+    with open(file_name, 'rb', buffering=chunk_size) as f:
+        for offset, section in iter_stream_sections(f, marker, encoding=encoding):
+            yield offset, section
+
+
+def iter_section_bounds(output, marker):
+    """
+    Positions of the sections of a string delimited by a marker (the text is not copied)
+
+    :param output: the Q-Chem output
+    :param marker: string that delimits the sections
+    :return: generator of (start, end) positions of each section (same sections as iter_file_sections)
+    """
+    previous = 0
+    position = output.find(marker)
+    while position >= 0:
+        yield previous, position
+        previous = position
+        position = output.find(marker, position + len(marker))
+
+    yield previous, len(output)
+
+
+def iter_string_sections(output, marker):
+    """
+    Split a string in sections delimited by a marker (same format as iter_file_sections)
+
+    :param output: the Q-Chem output
+    :param marker: string that delimits the sections
+    :return: generator of (character offset, section text)
+    """
+    for start, end in iter_section_bounds(output, marker):
+        yield start, output[start:end]
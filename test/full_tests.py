@@ -1,7 +1,27 @@
 from qcparsers.parsers import parser_optimization, parser_irc, parser_rasci
 from qcparsers.parsers import parser_frequencies, parser_basic, parser_cis, parser_fchk
+from qcparsers.parsers import parse_file
+from qcparsers.batch import parse_batch
+from qcparsers.cache import ParserCache, enable_cache, disable_cache
+import qcparsers.parsers
+from qcparsers.tools.errors import ParserError
+from qcparsers.parsers.irc import iter_irc_steps
+from qcparsers.parsers.optimization import OptimizationFollower
+from qcparsers.tools.index import OutputIndex
+from qcparsers.abstractions.basis import BasisSet, intern_basis
+from qcparsers.abstractions.molecule import Molecule
+from qcparsers.tools import elements
+from qcparsers.parsers.cis.support import get_soc_matrix
+from qcparsers.parsers.fchk.support import get_all_nto, get_nto_arrays
+from qcparsers.parsers.rasci.support import get_interstate_arrays, read_soc_matrix, read_simple_matrix
+from qcparsers.parsers.frequencies import read_hessian
+from qcparsers.tools import read_block_matrix
+import numpy as np
 import unittest
+import tempfile
 import pickle
+import re
+import os
 
 
 store = False
@@ -42,6 +62,526 @@ class ParsersTest(unittest.TestCase):
         print(data)
         self.assertDictEqual(data, data_ref)
 
+    def test_fchk_1_lazy(self):
+
+        with open('fchk_1.out', 'r') as f:
+            qchem_output = f.read()
+
+        data = parser_fchk(qchem_output)
+        data_lazy = parser_fchk('fchk_1.out', lazy=True)
+
+        self.assertEqual(data['basis'], data_lazy['basis'])
+        self.assertEqual(data['structure'], data_lazy['structure'])
+        np.testing.assert_allclose(data['coefficients']['alpha'], data_lazy['coefficients']['alpha'])
+        np.testing.assert_allclose(data['scf_density'], data_lazy['scf_density'])
+
+    def test_fchk_1_packed(self):
+
+        with open('fchk_1.out', 'r') as f:
+            qchem_output = f.read()
+
+        density = np.array(parser_fchk(qchem_output)['scf_density'])
+        density_packed = parser_fchk(qchem_output, packed=True)['scf_density']
+        vector = np.arange(len(density), dtype=float)
+
+        np.testing.assert_allclose(density, density_packed.get_dense())
+        np.testing.assert_allclose(density.dot(vector), density_packed.dot(vector))
+        self.assertAlmostEqual(np.trace(density.dot(density)), density_packed.trace_dot(density_packed))
+        self.assertEqual(density[3, 1], density_packed[1, 3])
+
+    def test_fchk_1_basis_by_element(self):
+
+        with open('fchk_1.out', 'r') as f:
+            qchem_output = f.read()
+
+        basis = parser_fchk(qchem_output)['basis']
+        basis_txt = basis.get_qc_input_txt(by_element=True)
+
+        symbols = [atom['symbol'] for atom in basis.get_dictionary()['atoms']]
+        self.assertEqual(basis_txt.count('****'), len(set(symbols)))
+        self.assertTrue(basis.get_qc_input_txt().startswith(basis_txt.split('****')[0]))
+
+    def test_fchk_nto_without_coefficients(self):
+
+        fchk_output = """Title
+SP        RHF                                                         3-21G
+Natural Transition Orbital occupancies     R   N=           2
+  9.00000000E-01  1.00000000E-01
+Natural Transition Orbital occupancies     R   N=           2
+  8.00000000E-01  2.00000000E-01
+"""
+        nto_coefficients, nto_occupancies = get_nto_arrays(fchk_output)
+        self.assertEqual(nto_coefficients['U'].shape[0], 0)
+        self.assertEqual(nto_occupancies.shape, (2, 2))
+
+        nto_coefficients, nto_occupancies = get_all_nto(fchk_output)
+        self.assertListEqual(nto_coefficients, [])
+        self.assertListEqual(nto_occupancies, [[0.9, 0.1], [0.8, 0.2]])
+
+    def test_fchk_1_basis_interning(self):
+
+        with open('fchk_1.out', 'r') as f:
+            qchem_output = f.read()
+
+        basis = parser_fchk(qchem_output)['basis']
+        basis_2 = parser_fchk(qchem_output)['basis']
+        self.assertIs(basis, basis_2)
+
+        basis_copy = pickle.loads(pickle.dumps(basis))
+        self.assertIsNot(basis_copy, basis)
+        self.assertEqual(basis_copy.fingerprint, basis.fingerprint)
+        self.assertEqual(basis_copy, basis)
+        self.assertEqual(hash(basis_copy), hash(basis))
+        self.assertIs(intern_basis(basis_copy), basis)
+
+        # the dictionaries of a shared basis set are independent
+        dictionary = basis.get_dictionary()
+        dictionary['atoms'][0]['symbol'] = 'X'
+        self.assertNotEqual(basis_2.get_dictionary()['atoms'][0]['symbol'], 'X')
+
+        other = BasisSet('other', [1], ['H'], shell_type=[0], n_primitives=[1], atom_map=[1],
+                         p_exponents=[0.5], c_coefficients=[1.0], p_c_coefficients=[0.0])
+        self.assertNotEqual(other.fingerprint, basis.fingerprint)
+        self.assertNotEqual(other, basis)
+        self.assertNotEqual(basis, basis.fingerprint)
+        self.assertNotEqual(basis, hash(basis))
+
+    def test_molecule_pickle(self):
+
+        molecule = Molecule(coordinates=[[0.0, 0.0, 0.0], [0.0, 0.0, 0.74]], symbols=['H', 'H'], charge=1, name='H2+')
+        number_of_electrons = molecule.number_of_electrons
+
+        molecule_copy = pickle.loads(pickle.dumps(molecule))
+        self.assertEqual(molecule_copy, molecule)
+        self.assertEqual(molecule_copy.name, 'H2+')
+        self.assertEqual(molecule_copy.number_of_electrons, number_of_electrons)
+        self.assertFalse(hasattr(molecule_copy, '__dict__'))
+
+        # state of objects stored before the use of __slots__
+        molecule_old = Molecule.__new__(Molecule)
+        molecule_old.__setstate__({'_coordinates': molecule.coordinates, '_symbols': ['H', 'H'], '_charge': 1,
+                                   '_multiplicity': 1, '_name': 'H2+', '_atomic_numbers': None})
+        self.assertEqual(molecule_old, molecule)
+        self.assertEqual(molecule_old.get_number_of_atoms(), 2)
+
+        # the cached symbols are not modified by the caller
+        symbols = molecule.get_symbols()
+        symbols[0] = 'X'
+        self.assertEqual(molecule.get_symbols()[0], 'H')
+
+    def test_elements(self):
+
+        np.testing.assert_array_equal(elements.symbols_to_numbers(['H', 'cl', 'FE', 'X']), [1, 17, 26, 0])
+        self.assertListEqual(elements.numbers_to_symbols([1, 17, 26]), ['H', 'Cl', 'Fe'])
+        self.assertListEqual(elements.normalize_symbols(['CL', 'c', 'Gh']), ['Cl', 'C', 'Gh'])
+        np.testing.assert_allclose(elements.numbers_to_masses([1, 8]), [1.00794, 15.9994])
+        np.testing.assert_allclose(elements.symbols_to_masses(['h', 'O']), [1.00794, 15.9994])
+        self.assertEqual(elements.element_names[6], 'Carbon')
+        self.assertFalse(elements.atomic_masses.flags.writeable)
+
+        basis = BasisSet('sto-3g', [1, 8], None, shell_type=[0, 0], n_primitives=[1, 1], atom_map=[1, 2],
+                         p_exponents=[0.5, 1.0], c_coefficients=[1.0, 1.0], p_c_coefficients=[0.0, 0.0])
+        self.assertListEqual([atom['symbol'] for atom in basis.get_dictionary()['atoms']], ['H', 'O'])
+
+    def test_basis_mixed_element(self):
+
+        # two carbon atoms with different basis
+        basis = BasisSet('mixed', [6, 6, 1], ['C', 'C', 'H'],
+                         shell_type=[0, 0, 0], n_primitives=[1, 1, 1], atom_map=[1, 2, 3],
+                         p_exponents=[1.0, 2.0, 0.5], c_coefficients=[1.0, 1.0, 1.0], p_c_coefficients=[0.0, 0.0, 0.0])
+
+        self.assertListEqual(basis.get_element_atoms(), [0, 1, 2])
+        self.assertEqual(basis.get_qc_input_txt(by_element=True), basis.get_qc_input_txt())
+
+    def test_frequencies_1_extra_rows(self):
+
+        with open('frequencies_1.out', 'r') as f:
+            qchem_output = f.read()
+
+        raman_active = ' Raman Active:       YES                    YES                    YES\n'
+        qchem_output = qchem_output.replace(raman_active, raman_active +
+                                            ' Raman Intens:      1.234                  2.000                  3.500\n')
+
+        data = parser_frequencies(qchem_output)
+
+        self.assertListEqual([mode['raman_intensity'] for mode in data['modes']], [1.234, 2.0, 3.5])
+
+    def test_cis_2_arrays(self):
+
+        with open('cis_2.out', 'r') as f:
+            qchem_output = f.read()
+
+        data = parser_cis(qchem_output, as_arrays=True)
+        soc_matrix = data['soc_matrix']
+        positions = {sublevel: i for i, sublevel in enumerate(data['soc_sublevels'])}
+
+        np.testing.assert_allclose(soc_matrix, soc_matrix.conj().T)
+        np.testing.assert_allclose(data['excited_states_arrays']['excitation_energy'],
+                                   [state['excitation_energy'] for state in data['excited_states']])
+        self.assertEqual(data['excited_states_arrays']['transition_moment'].shape, (len(data['excited_states']), 3))
+        for state in range(1, len(data['excited_states']) + 1):
+            if (state, -1) in positions:
+                np.testing.assert_allclose(data['interstate_properties'][(0, state)]['1e_soc_mat'],
+                                           [soc_matrix[0, positions[(state, ms)]] for ms in [-1, 0, 1]])
+
+        # the SOC of each pair has the same values and shape of the list output
+        data_lists = parser_cis(qchem_output)
+        self.assertEqual(data['interstate_properties'].keys(), data_lists['interstate_properties'].keys())
+        for pair, properties in data_lists['interstate_properties'].items():
+            soc = data['interstate_properties'][pair]['1e_soc_mat']
+            self.assertEqual(soc.shape, np.shape(properties['1e_soc_mat']))
+            self.assertListEqual(soc.tolist(), properties['1e_soc_mat'])
+            self.assertEqual(data['interstate_properties'][pair]['soc_units'], properties['soc_units'])
+
+        # rows that are not sublevels of the states are skipped
+        tables = {'SOC between the singlet ground state and excited triplet states (ms=1)': {'T1(ms=1)': 1.0j,
+                                                                                               'Total': 2.0}}
+        soc_matrix, sublevels = get_soc_matrix(tables, ['T1'])
+        np.testing.assert_allclose(soc_matrix[0], [0.0, 0.0, 0.0, 1.0j])
+
+    def test_rasci_1_arrays(self):
+
+        with open('rasci_1.out', 'r') as f:
+            qchem_output = f.read()
+
+        data = parser_rasci(qchem_output)
+        data_arrays = parser_rasci(qchem_output, as_arrays=True)
+
+        for state, state_arrays in zip(data['excited_states'], data_arrays['excited_states']):
+            configurations = state_arrays['configurations_array']
+            occupations = state_arrays['occupations_array']
+            self.assertEqual(occupations['alpha'].dtype, np.uint8)
+            self.assertEqual(occupations['beta'].shape, (len(configurations), occupations['beta'].shape[1]))
+            np.testing.assert_allclose(configurations['amplitude'],
+                                       [conf['amplitude'] for conf in state['configurations']])
+            for i, conf in enumerate(state['configurations']):
+                self.assertEqual(configurations['hole'][i], conf['hole'])
+                self.assertEqual(occupations['alpha'][i].tolist(), conf['occupations']['alpha'])
+                self.assertEqual(occupations['beta'][i].tolist(), conf['occupations']['beta'])
+
+    def test_rasci_interstate_arrays(self):
+
+        soc_12 = [[1.0 + 1.0j], [2.0 + 0.0j], [3.0 - 1.0j]]
+        interstate_dict = {(1, 2): {'1e_soc_mat': soc_12, 'gamma_total': 0.5, 'mf_socc': 3.0},
+                           (1, 3): {'1e_soc_mat': [[4.0j]], 'gamma_total': 0.2, 'mf_socc': 1.0}}
+
+        arrays, pair_blocks = get_interstate_arrays(interstate_dict, {1: 0, 2: 1.0, 3: 0})
+        soc_matrix = arrays['1e_soc_mat']
+
+        self.assertEqual(arrays['sublevels'], [(1, 0), (2, -1.0), (2, 0.0), (2, 1.0), (3, 0)])
+        self.assertEqual(soc_matrix.shape, (5, 5))
+        np.testing.assert_allclose(soc_matrix, soc_matrix.conj().T)
+        np.testing.assert_allclose(soc_matrix[1:4, 0:1], soc_12)
+        np.testing.assert_allclose(soc_matrix[4:5, 0:1], [[4.0j]])
+        np.testing.assert_allclose(soc_matrix[1:4, 4], 0)
+        self.assertTrue(np.shares_memory(pair_blocks[(1, 2)]['1e_soc_mat'], soc_matrix))
+        self.assertIs(interstate_dict[(1, 2)]['1e_soc_mat'], soc_12)
+        self.assertNotIn('2e_soc_mat', pair_blocks[(1, 2)])
+
+        np.testing.assert_allclose(arrays['gamma_total'], [[0.0, 0.5, 0.2], [0.5, 0.0, 0.0], [0.2, 0.0, 0.0]])
+        np.testing.assert_allclose(arrays['mf_socc'], [[0.0, 3.0, 1.0], [3.0, 0.0, 0.0], [1.0, 0.0, 0.0]])
+
+    def test_read_block_matrix(self):
+
+        matrix = read_block_matrix(['h', 'L  1.0 + -2.0i  3.0 - -4.0i'], 1, 2, label_width=3, complex_values=True)
+        np.testing.assert_allclose(matrix, [[1.0 - 2.0j, 3.0 + 4.0j]])
+
+    def test_frequencies_1_hessian(self):
+
+        with open('frequencies_1.out', 'r') as f:
+            qchem_output = f.read()
+
+        hessian_section = qchem_output[qchem_output.find('Hessian of the SCF Energy'):
+                                       qchem_output.find('VIBRATIONAL ANALYSIS')]
+        ndim = 9  # two blocks of columns (6 + 3)
+
+        # previous implementation
+        ncol = 6
+        hess_block = hessian_section.split('\n')[1:]
+        hessian_ref = []
+        for i in range(ndim):
+            line = []
+            for block in range((ndim-1)//ncol + 1):
+                line += hess_block[block*(ndim+1) + i + 1].split()[1:]
+            hessian_ref.append(line)
+
+        hessian = read_hessian(hessian_section, ndim)
+        self.assertEqual(hessian.shape, (ndim, ndim))
+        np.testing.assert_array_equal(hessian, np.array(hessian_ref, dtype=float))
+
+        # displacements of all the modes with the Hessian
+        data = parser_frequencies(qchem_output)
+        data_arrays = parser_frequencies(qchem_output, as_arrays=True)
+        self.assertEqual(data_arrays['hessian'].shape, (ndim, ndim))
+        self.assertEqual(data_arrays['displacements'].shape, (len(data['modes']), ndim // 3, 3))
+        np.testing.assert_array_equal(data_arrays['displacements'],
+                                      [mode['displacement'] for mode in data['modes']])
+
+    def test_rasci_soc_matrix(self):
+
+        # 1-elec SOC matrix between a triplet (rows) and a septet (columns), two blocks of columns (5 + 2)
+        soc_text = """ 1-elec SOC matrix (cm-1)
+                  |Sz=-3.00>            |Sz=-2.00>            |Sz=-1.00>            |Sz= 0.00>            |Sz= 1.00>
+ <Sz=-1.00|    -0.00000   1.25000i     0.00000  -2.50000i     0.75000   0.00000i    -0.00000   0.00000i     0.00000   3.12500i
+ <Sz= 0.00|     0.00000   0.00000i    -1.50000   0.25000i     0.00000  -0.00000i     0.50000   0.50000i    -0.00000  -0.12500i
+ <Sz= 1.00|     0.00000  -4.00000i     0.00000   0.00000i    -0.00000   1.00000i     0.00000  -0.00000i     2.00000   0.00000i
+                  |Sz= 2.00>            |Sz= 3.00>
+ <Sz=-1.00|     0.10000   0.20000i    -0.30000  -0.40000i
+ <Sz= 0.00|     0.00000   0.00000i     0.00000   0.00000i
+ <Sz= 1.00|    -0.50000   0.60000i     0.70000  -0.80000i
+"""
+        lines = soc_text.split('\n')[1:]
+        dimensions = [3, 7]
+
+        # previous implementation
+        col_per_line = 5
+        soc_ref = []
+        for ib in range(dimensions[0]):
+            real = []
+            complex = []
+            for j in range((dimensions[1] - 1) // col_per_line + 1):
+                real += lines[j*dimensions[0] + 1 * (j+1) + ib][11:].split()[0::2]
+                complex += lines[j*dimensions[0] + 1 * (j+1) + ib][11:].split()[1::2]
+            soc_ref.append([float(r) + float(c[:-1]) * 1j for r, c in zip(real, complex)])
+
+        soc_matrix = read_soc_matrix(lines, dimensions)
+        self.assertEqual(soc_matrix.shape, (3, 7))
+        np.testing.assert_array_equal(soc_matrix, soc_ref)
+
+    def test_rasci_simple_matrix(self):
+
+        matrix_text = """ showmatrix final adiabatic -> diabatic
+   0.9876543  -0.1234567   0.0123456
+   0.1234567   0.9765432  -0.1765432
+   0.0098765   0.1776543   0.9840123
+ -------------------------------------
+ showmatrix final adiabatic -> diabatic
+   0.7071068   0.7071068
+  -0.7071068   0.7071068
+ -------------------------------------
+"""
+        header = 'showmatrix final adiabatic -> diabatic'
+
+        # previous implementation
+        matrix_ref = []
+        for m in re.finditer(header, matrix_text):
+            section_state = matrix_text[m.end():m.end() + 10000]
+            section_state = section_state[:section_state.find('-------')]
+            dim = len(section_state.split('\n')[1].split())
+            matrix = section_state.split('\n')[1:dim + 1]
+            matrix_ref.append([[float(n) for n in l.split()] for l in matrix])
+
+        matrix_list = read_simple_matrix(header, matrix_text)
+        self.assertEqual(len(matrix_list), 2)
+        for matrix, matrix_ref in zip(matrix_list, matrix_ref):
+            np.testing.assert_array_equal(matrix, matrix_ref)
+
+    def test_cis_2_compact(self):
+
+        with open('cis_2.out', 'r') as f:
+            qchem_output = f.read()
+
+        data = parser_cis(qchem_output, compact=True)
+
+        with open('cis_2.pkl', 'rb') as stream:
+            data_ref = pickle.load(stream)
+
+        for state, state_ref in zip(data['excited_states'], data_ref['excited_states']):
+            self.assertEqual(len(state['configurations']), len(state_ref['configurations']))
+            for configuration, configuration_ref in zip(state['configurations'], state_ref['configurations']):
+                self.assertDictEqual(configuration, configuration_ref)
+
+        # compact configurations can be stored
+        data_copy = pickle.loads(pickle.dumps(data))
+        self.assertDictEqual(data_copy['excited_states'][0]['configurations'][0],
+                             data['excited_states'][0]['configurations'][0])
+
+        # the threshold applies to the stored amplitudes
+        data = parser_cis(qchem_output, amplitude_threshold=0.4)
+        for state, state_ref in zip(data['excited_states'], data_ref['excited_states']):
+            self.assertListEqual(state['configurations'],
+                                 [configuration for configuration in state_ref['configurations']
+                                  if abs(configuration['amplitude']) >= 0.4])
+
+    def test_parse_file(self):
+
+        for f_name, parser in [('optimization_1', parser_optimization), ('irc_1', parser_irc)]:
+            data = parse_file('{}.out'.format(f_name), parser, chunk_size=4096)
+
+            with open('{}.pkl'.format(f_name), 'rb') as stream:
+                data_ref = pickle.load(stream)
+
+            self.assertDictEqual(data, data_ref)
+
+    def test_parse_batch(self):
+
+        files = ['optimization_1.out', 'irc_1.out', 'missing.out']
+        results = list(parse_batch(files, max_workers=2))
+
+        self.assertListEqual([f_name for f_name, data in results], files)
+        for f_name, data in results[:2]:
+            with open(f_name.replace('.out', '.pkl'), 'rb') as stream:
+                data_ref = pickle.load(stream)
+
+            self.assertDictEqual(data, data_ref)
+
+        self.assertIsInstance(results[2][1], ParserError)
+
+        # more files than the window of submitted tasks
+        results = list(parse_batch(files * 2, max_workers=1, ordered=False))
+        self.assertListEqual(sorted([f_name for f_name, data in results]), sorted(files * 2))
+
+    def test_parser_cache(self):
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = ParserCache(cache_dir)
+            for i in range(2):
+                data = cache.parse_file('rasci_1.out', parser_rasci)
+
+                with open('rasci_1.pkl', 'rb') as stream:
+                    data_ref = pickle.load(stream)
+
+                self.assertDictEqual(data, data_ref)
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+            # arguments that cannot be serialized are not part of the key
+            with open('rasci_1.out', 'r') as f:
+                qchem_output = f.read()
+            cached_parser = cache.wrap(parser_rasci)
+            cached_parser(qchem_output, False)
+            cached_parser(qchem_output, as_arrays=False, index=OutputIndex(qchem_output))
+            self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            enable_cache(cache_dir)
+            try:
+                data = parse_file('irc_1.out', qcparsers.parsers.parser_irc)
+            finally:
+                disable_cache()
+
+            with open('irc_1.pkl', 'rb') as stream:
+                data_ref = pickle.load(stream)
+
+            self.assertDictEqual(data, data_ref)
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+    def test_optimization_1_trajectory(self):
+
+        with open('optimization_1.out', 'r') as f:
+            qchem_output = f.read()
+
+        data = parser_optimization(qchem_output, as_trajectory=True)
+
+        with open('optimization_1.pkl', 'rb') as stream:
+            data_ref = pickle.load(stream)
+
+        trajectory = data.pop('optimization_steps')
+        steps_ref = data_ref.pop('optimization_steps')
+        self.assertDictEqual(data, data_ref)
+
+        self.assertEqual(len(trajectory), len(steps_ref))
+        for molecule, step_ref in zip(trajectory, steps_ref):
+            self.assertEqual(molecule, step_ref['molecule'])
+        np.testing.assert_allclose(trajectory.energies, [step['energy'] for step in steps_ref])
+        self.assertEqual(trajectory.get_step_lengths().shape, (len(steps_ref) - 1,))
+
+        arrays = parser_optimization(qchem_output, as_arrays=True)['optimization_arrays']
+        np.testing.assert_allclose(arrays['gradients'], [step['gradient'] for step in steps_ref])
+        np.testing.assert_allclose(arrays['coordinates'], trajectory.coordinates)
+
+    def test_shared_index(self):
+
+        with open('cis_2.out', 'r') as f:
+            qchem_output = f.read()
+
+        index = OutputIndex(qchem_output)
+        self.assertEqual(index.find('Molecular Point Group'), qchem_output.find('Molecular Point Group'))
+        self.assertEqual(index.rfind('There are '), qchem_output.rfind('There are '))
+
+        data = parser_cis(qchem_output, index=index)
+        data_basic = parser_basic(qchem_output, index=index)
+
+        with open('cis_2.pkl', 'rb') as stream:
+            data_ref = pickle.load(stream)
+
+        self.assertDictEqual(data, data_ref)
+        self.assertEqual(data_basic['scf_energy'], data['scf_energy'])
+
+    def test_iter_irc_steps(self):
+
+        with open('irc_1.pkl', 'rb') as stream:
+            data_ref = pickle.load(stream)
+
+        forward_steps = [step for step in iter_irc_steps(file_name='irc_1.out') if step['branch'] == 'forward']
+
+        self.assertEqual(len(forward_steps), len(data_ref['irc_forward']))
+        for step, step_ref in zip(forward_steps, data_ref['irc_forward']):
+            self.assertEqual(step['molecule'], step_ref['molecule'])
+            self.assertEqual(step['energy'], step_ref['energy'])
+
+        with open('irc_1.out', 'r') as f:
+            qchem_output = f.read()
+
+        steps = list(iter_irc_steps(qchem_output))
+        self.assertListEqual([step['energy'] for step in steps],
+                             [step['energy'] for step in iter_irc_steps(file_name='irc_1.out')])
+
+        # all the output modes contain the backward branch
+        trajectories = parser_irc(qchem_output, as_trajectory=True)
+        backward_energies = [step['energy'] for step in steps if step['branch'] == 'backward']
+        self.assertListEqual([step['energy'] for step in data_ref['irc_backward']], backward_energies)
+        np.testing.assert_allclose(trajectories['irc_backward'].energies, backward_energies)
+
+        data_arrays = parser_irc(qchem_output, as_arrays=True)
+        np.testing.assert_allclose(data_arrays['irc_backward_arrays']['energies'], backward_energies)
+        np.testing.assert_allclose(data_arrays['irc_forward_arrays']['coordinates'],
+                                   trajectories['irc_forward'].coordinates)
+        self.assertEqual(len(trajectories['irc_forward']), len(forward_steps))
+
+    def test_optimization_follower(self):
+
+        with open('optimization_1.out', 'rb') as f:
+            qchem_output = f.read()
+
+        with open('optimization_1.pkl', 'rb') as stream:
+            data_ref = pickle.load(stream)
+
+        converged = []
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_name = os.path.join(temp_dir, 'running.out')
+            open(file_name, 'wb').close()
+
+            follower = OptimizationFollower(file_name, on_converged=converged.append)
+            for i in range(0, len(qchem_output), 2000):
+                with open(file_name, 'ab') as f:
+                    f.write(qchem_output[i:i + 2000])
+                follower.poll()
+
+        self.assertEqual(len(converged), 1)
+        self.assertEqual(len(follower.cycles), len(data_ref['optimization_steps']))
+        self.assertDictEqual(follower.get_data(), data_ref)
+        self.assertTrue(follower.finished)
+
+        # optimization that ends without converging (killed or failed job)
+        truncated = qchem_output[:qchem_output.find(b' ******************************\n **  OPTIMIZATION CONVERGED')]
+        error = b' Q-Chem fatal error occurred in module libgen/opt.C\n\n MAXIMUM OPTIMIZATION CYCLES REACHED\n'
+        for end, closed in [(b'', True), (error, False)]:
+            finished = []
+            with tempfile.TemporaryDirectory() as temp_dir:
+                file_name = os.path.join(temp_dir, 'running.out')
+                with open(file_name, 'wb') as f:
+                    f.write(truncated + end)
+
+                follower = OptimizationFollower(file_name, on_finished=finished.append)
+                follower.poll()
+                self.assertEqual(len(follower.cycles), len(data_ref['optimization_steps']) - closed)
+                self.assertEqual(follower.finished, not closed)
+                follower.close()
+
+            self.assertEqual(len(finished), 1)
+            self.assertFalse(follower.converged)
+            self.assertDictEqual(finished[0], {'optimization_steps': data_ref['optimization_steps']})
+
 
 def add_test(cls, f_name, parser):
     def test_method(self):